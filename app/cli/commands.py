@@ -34,8 +34,7 @@ def add(files):
     """Add file(s) to the staging area."""
     try:
         repo = Repository()
-        for file_path in files:
-            repo.add(file_path)
+        repo.add_many(list(files))
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
         exit(1)
@@ -3,15 +3,19 @@ index.py: Manages the staging area functionality.
 """
 
 import json
+import os
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional, Tuple
 
 from app.utils.logger import logger
 from app.utils.file_utils import get_relative_path, read_text_file, write_text_file
 
 
 class Index:
+    __slots__ = ("index_path", "_cache", "_stat", "_open", "_timestamp")
+
     def __init__(self, index_path: Path):
         """Initialize index manager.
 
@@ -20,20 +24,44 @@ class Index:
         """
         self.index_path = index_path
 
+        # Last parsed index and the stat key of the file it was read from;
+        # reads reuse it until the file changes on disk
+        self._cache: Optional[Dict[str, Any]] = None
+        self._stat: Optional[Tuple[int, int, int]] = None
+
+        # Set while open() defers writes to the end of a batch, along with the
+        # staging time shared by every entry added in it
+        self._open = False
+        self._timestamp: Optional[str] = None
+
     def read(self) -> Dict[str, Any]:
         """Read the current index state.
 
+        The parsed index is cached and only re-read when the file's
+        modification time, size or inode changes, so repeated reads cost a
+        single stat.
+
         Returns:
             Dict[str, Any]: Current index contents
         """
+        if self._open:
+            return self._cache
+
+        stat_key = self._stat_key()
+        if self._cache is not None and stat_key == self._stat:
+            return self._cache
+
+        index_data = {"version": 1, "entries": {}}
         try:
             content = read_text_file(self.index_path)
             if content:
-                return json.loads(content)
+                index_data = json.loads(content)
         except (json.JSONDecodeError, FileNotFoundError) as e:
-            logger.debug(f"Creating new index due to: {str(e)}")
+            logger.debug("Creating new index due to: %s", e)
 
-        return {"version": 1, "entries": {}}
+        self._cache = index_data
+        self._stat = stat_key
+        return index_data
 
     def write(self, index_data: Dict[str, Any]) -> None:
         """Write index data to file.
@@ -42,33 +70,100 @@ class Index:
             index_data (Dict[str, Any]): Index data to write
         """
         try:
-            content = json.dumps(index_data, indent=2)
-            write_text_file(self.index_path, content)
+            # Compact output keeps json on its C encoder; indent forces the
+            # pure-Python one and roughly doubles the file size
+            content = json.dumps(index_data, separators=(",", ":"))
+            # Flushed before the rename so a crash cannot replace the index
+            # with a partly written file; open() batches make this once per add
+            write_text_file(self.index_path, content, durable=True)
+            self._cache = index_data
+            self._stat = self._stat_key()
         except Exception as e:
             logger.error(f"Failed to write index: {str(e)}")
             raise
 
-    def add_file(self, file_path: Path, hash_value: str, repo_path: Path) -> None:
+    def _stat_key(self) -> Optional[Tuple[int, int, int]]:
+        """Get what identifies the index file's current contents.
+
+        The modification time alone can miss a rewrite that lands within the
+        filesystem's timestamp granularity. Writes replace the file by rename,
+        so they also change its inode, and usually its size.
+
+        Returns:
+            Optional[Tuple[int, int, int]]: (mtime in ns, size, inode), or
+                None if the file is missing
+        """
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    @contextmanager
+    def open(self) -> Iterator[Dict[str, Any]]:
+        """Load the index once and defer writing it until the block exits.
+
+        Nested calls reuse the index that is already open; only the outermost
+        block writes it back. Nothing is written if the block raises. Every
+        file added within the block is stamped with the time it was opened.
+
+        Yields:
+            Dict[str, Any]: In-memory index contents
+        """
+        if self._open:
+            yield self._cache
+            return
+
+        index_data = self.read()
+        self._timestamp = datetime.now().isoformat()
+        self._open = True
+        try:
+            yield index_data
+        except BaseException:
+            # Drop the partially updated copy so later reads go back to disk
+            self._cache = None
+            raise
+        else:
+            self.write(self._cache)
+        finally:
+            self._open = False
+
+    def add_file(self, rel_path: str, hash_value: str, size: int) -> None:
         """Add a file to the index.
 
         Args:
-            file_path (Path): Path to the file being added
+            rel_path (str): Path of the file relative to the repository root
             hash_value (str): Hash of the file content
-            repo_path (Path): Repository root path for relative path calculation
+            size (int): Size of the file content in bytes
         """
-        try:
-            index = self.read()
-            rel_path = get_relative_path(file_path, repo_path)
+        with self.open():
+            self.add_file_cached(rel_path, hash_value, size)
+
+    def add_file_cached(self, rel_path: str, hash_value: str, size: int) -> None:
+        """Add a file to the open in-memory index without touching disk.
 
+        Args:
+            rel_path (str): Path of the file relative to the repository root,
+                as computed by the caller when it validated the path
+            hash_value (str): Hash of the file content
+            size (int): Size of the file content in bytes, as measured while
+                hashing it
+
+        Raises:
+            RuntimeError: If the index has not been opened with open()
+        """
+        if not self._open:
+            raise RuntimeError("Index must be opened before adding files")
+
+        try:
             # Update file entry
-            index["entries"][rel_path] = {
+            self._cache["entries"][rel_path] = {
                 "hash": hash_value,
-                "timestamp": datetime.now().isoformat(),
-                "size": file_path.stat().st_size,
+                "timestamp": self._timestamp,
+                "size": size,
             }
 
-            self.write(index)
-            logger.debug(f"Added to index: {rel_path}")
+            logger.debug("Added to index: %s", rel_path)
 
         except Exception as e:
             logger.error(f"Failed to add file to index: {str(e)}")
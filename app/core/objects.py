@@ -3,18 +3,261 @@ objects.py: Core object storage and retrieval functionality.
 """
 
 import json
+import os
+import shutil
+import stat
+import string
+import struct
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import islice
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, Any, Optional, Set
+from typing import Dict, Any, Iterator, List, Optional, Set, Tuple, Union
 
-from app.utils.hash_utils import hash_object
-from app.utils.file_utils import write_text_file, read_text_file, ensure_dir
+from app.utils.cache_utils import LRUCache
+from app.utils.chunk_utils import iter_file_chunks
+from app.utils.hash_utils import CHUNK_SIZE, hash_bytes, new_hasher
+from app.utils.file_utils import (
+    ensure_dir,
+    fsync_dir,
+    iter_mapped_chunks,
+    iter_read_chunks,
+)
 from app.utils.logger import logger
 
 
+# Objects are stored as gzip-framed zlib streams. Earlier versions stored raw
+# UTF-8 text, which can never start with the gzip magic bytes, so both kinds
+# can be told apart on read. Level 1 keeps compression close to copy speed.
+GZIP_MAGIC = b"\x1f\x8b"
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+COMPRESSION_LEVEL = 1
+
+# Files at least this large are stored as content-defined chunks plus a
+# manifest listing their hashes, so a small edit only adds the changed chunks.
+# Manifests start with a 0xFF byte, which can appear neither in gzip data nor
+# in the UTF-8 text stored by earlier versions.
+CHUNKED_OBJECT_MIN_SIZE = 1024 * 1024
+MANIFEST_MAGIC = b"\xffpygrits-chunks\n"
+
+# New objects are written to mkstemp files, which are created readable by
+# their owner only. They are given the mode a plain open() would produce
+# instead, so objects stay readable in shared or group-readable repositories.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+OBJECT_FILE_MODE = 0o666 & ~_UMASK
+
+# Objects live in two-level shards (objects/ab/cdef...) so that no single
+# directory grows large enough to slow down lookups. Stores created by earlier
+# versions kept objects flat; objects/info/sharded marks a store whose objects
+# have all been moved into shards
+SHARD_PREFIX_LENGTH = 2
+
+# Commits are stored as compact, key-sorted JSON. Version 1 commits (no
+# "version" field) were indented; both parse the same way. Commits also carry
+# a "generation" number (1 + the parent's) unless written by older releases
+COMMIT_FORMAT_VERSION = 2
+
+# Number of threads used to write files out of the store in parallel
+RESTORE_WORKERS = 16
+
+# Number of threads used to flush new objects to disk at the end of a batch
+SYNC_WORKERS = 16
+
+# Number of threads reading commits ahead of a history walk, and how many
+# reads may be in flight at once so a slow consumer doesn't buffer history
+HISTORY_WORKERS = 4
+HISTORY_READ_AHEAD = 16
+
+# Objects are immutable once stored, so parsed commits can be cached for the
+# lifetime of the store without invalidation
+COMMIT_CACHE_SIZE = 1024
+
+# The commit graph (objects/info/commit-graph) holds one fixed-width record per
+# commit: SHA1 digests of the commit and its parent (zeros for a root commit),
+# the generation number and the timestamp in microseconds. It lets history be
+# walked without opening commit objects.
+COMMIT_GRAPH_RECORD = struct.Struct(">20s20sIq")
+NULL_DIGEST = bytes(20)
+
+# (parent hash, generation, timestamp in microseconds)
+CommitGraphEntry = Tuple[str, int, int]
+
+
 class ObjectStore:
+    __slots__ = (
+        "objects_dir",
+        "_objects_dir_str",
+        "_commit_cache",
+        "_pending_sync",
+        "_sharded_marker_path",
+        "_sharded",
+        "_commit_graph_path",
+        "_commit_graph",
+        "_commit_graph_size",
+    )
+
     def __init__(self, objects_dir: Path):
         self.objects_dir = objects_dir
+        self._objects_dir_str = str(objects_dir) + os.sep
+        self._commit_cache = LRUCache(COMMIT_CACHE_SIZE)
+
+        # (temporary path, object path) of objects written during the current
+        # batch, awaiting sync
+        self._pending_sync: Optional[List[Tuple[str, str]]] = None
+
+        # Whether every object is known to be in a shard; checked on first need
+        self._sharded_marker_path = os.path.join(str(objects_dir), "info", "sharded")
+        self._sharded: Optional[bool] = None
+
+        # Parsed commit graph and the file size it was parsed at
+        self._commit_graph_path = os.path.join(str(objects_dir), "info", "commit-graph")
+        self._commit_graph: Dict[str, CommitGraphEntry] = {}
+        self._commit_graph_size = 0
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """Group object writes and make them durable together.
+
+        New objects are written to temporary files and only linked under
+        their hash once their data is on disk, so a crash can never leave a
+        partial object behind a valid name. Objects written inside the block
+        are flushed and linked in a single pass when it exits, so callers can
+        safely reference them from the index or HEAD afterwards. Outside a
+        batch each new object is flushed and linked as soon as it is written.
+        Nested calls join the outermost batch. If the block raises, its
+        unpublished objects are discarded.
+        """
+        if self._pending_sync is not None:
+            yield
+            return
+
+        self._pending_sync = []
+        try:
+            yield
+            self._sync_objects(self._pending_sync)
+        except BaseException:
+            for tmp_path, _ in self._pending_sync:
+                _remove_if_exists(tmp_path)
+            raise
+        finally:
+            self._pending_sync = None
+
+    def _record_write(self, tmp_path: str, object_path: str) -> None:
+        """Queue a fully written temporary file to become an object."""
+        if self._pending_sync is not None:
+            self._pending_sync.append((tmp_path, object_path))
+            return
+
+        try:
+            self._sync_objects([(tmp_path, object_path)])
+        except BaseException:
+            _remove_if_exists(tmp_path)
+            raise
+
+    def _sync_objects(self, pending: List[Tuple[str, str]]) -> None:
+        """Flush temporary object files to disk, then link them into place."""
+        if not pending:
+            return
+
+        tmp_paths = [tmp_path for tmp_path, _ in pending]
+        if len(tmp_paths) == 1:
+            # Not worth starting a thread pool for
+            _fsync_file(tmp_paths[0])
+        else:
+            max_workers = min(SYNC_WORKERS, len(tmp_paths))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(_fsync_file, tmp_paths))
+
+        created = [
+            object_path
+            for tmp_path, object_path in pending
+            if _publish_object(tmp_path, object_path)
+        ]
+
+        # Directory entries make the new names durable; each shard is
+        # synced once no matter how many objects landed in it
+        for directory in {os.path.dirname(object_path) for object_path in created}:
+            fsync_dir(directory)
+
+    def _object_path(self, hash_value: str) -> str:
+        """Get the sharded path an object is stored at.
+
+        Built by string concatenation: this runs for every object access and
+        is several times cheaper than joining Path objects.
+        """
+        return (
+            self._objects_dir_str
+            + hash_value[:SHARD_PREFIX_LENGTH]
+            + os.sep
+            + hash_value[SHARD_PREFIX_LENGTH:]
+        )
+
+    def _legacy_object_path(self, hash_value: str) -> Optional[str]:
+        """Get the flat path an object may still have in an unmigrated store.
+
+        Returns:
+            Optional[str]: objects/<hash>, or None once the store is sharded
+        """
+        if self._sharded is None:
+            self._sharded = os.path.exists(self._sharded_marker_path)
+        return None if self._sharded else self._objects_dir_str + hash_value
+
+    def ensure_sharded(self) -> int:
+        """Move flat objects into shards once, before the store is written to.
+
+        Stores that are already marked as sharded cost a single stat. Read-only
+        commands never migrate; they find unmigrated objects at their flat
+        paths instead.
+
+        Returns:
+            int: Number of objects moved
+        """
+        if self._legacy_object_path("") is None:
+            return 0
+
+        moved = self.migrate_flat_objects()
+        os.makedirs(os.path.dirname(self._sharded_marker_path), exist_ok=True)
+        with open(self._sharded_marker_path, "w"):
+            pass
+        self._sharded = True
+        return moved
+
+    def migrate_flat_objects(self) -> int:
+        """Move objects stored directly in objects/ into their shard directories.
+
+        Earlier versions kept every object at objects/<hash>. This is safe to
+        run repeatedly; once migrated it only lists the shard directories. A
+        missing objects directory has nothing to migrate.
+
+        Returns:
+            int: Number of objects moved
+        """
+        moved = 0
+        try:
+            entries = os.scandir(self.objects_dir)
+        except FileNotFoundError:
+            return 0
+
+        with entries:
+            for entry in entries:
+                if (
+                    len(entry.name) > SHARD_PREFIX_LENGTH
+                    and all(c in string.hexdigits for c in entry.name)
+                    and entry.is_file()
+                ):
+                    object_path = self._object_path(entry.name)
+                    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+                    os.replace(entry.path, object_path)
+                    moved += 1
+
+        if moved:
+            logger.debug("Moved %s object(s) into shard directories", moved)
+        return moved
 
     def store_object(self, content: str) -> str:
         """Store content and return its hash.
@@ -25,12 +268,126 @@ class ObjectStore:
         Returns:
             str: Hash of the stored content
         """
-        hash_value = hash_object(content)
-        object_path = self.objects_dir / hash_value
+        # Encode once and hash the same bytes that are stored; a large commit
+        # would otherwise be encoded twice
+        data = content.encode("utf-8")
+        hash_value = hash_bytes(data)
+        self._store_bytes(hash_value, data)
+        return hash_value
 
-        if not object_path.exists():
-            write_text_file(object_path, content)
+    def _store_bytes(self, hash_value: str, data: bytes, compress: bool = True) -> None:
+        """Store data under a precomputed hash unless that object exists."""
+        object_path = self._object_path(hash_value)
+        # An existing object already holds identical content
+        if os.path.exists(object_path):
+            return
 
+        shard_dir = os.path.dirname(object_path)
+        try:
+            fd, tmp_path = _create_temp_object(shard_dir)
+        except FileNotFoundError:
+            # First object in this shard
+            os.makedirs(shard_dir, exist_ok=True)
+            fd, tmp_path = _create_temp_object(shard_dir)
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_compress(data) if compress else data)
+        except BaseException:
+            _remove_if_exists(tmp_path)
+            raise
+        self._record_write(tmp_path, object_path)
+
+    def store_object_from_path(self, src_path: Path) -> Tuple[str, int]:
+        """Hash a file and copy it into the store unless it is already there.
+
+        The source is read into one reused buffer and fed to the hasher and
+        compressor as slices of it, so no intermediate bytes objects are
+        allocated. It is not memory-mapped: a working tree file truncated
+        while being added would crash the process with SIGBUS. The
+        content is written to a temporary file inside the objects directory
+        and renamed into place once its hash is known. The hash is computed
+        over the uncompressed content. The size is returned alongside the
+        hash so callers do not need to stat the file again.
+
+        Args:
+            src_path (Path): File to store
+
+        Returns:
+            Tuple[str, int]: Hash and size in bytes of the stored content
+        """
+        # Re-added files are often unchanged. A hash-only pass finds their
+        # objects without compressing anything. New content is hashed again
+        # below as it is written, so the object always matches its name even
+        # if the file changes in between.
+        hasher = new_hasher()
+        with open(src_path, "rb") as src:
+            size = os.fstat(src.fileno()).st_size
+            for chunk in iter_read_chunks(src, CHUNK_SIZE):
+                hasher.update(chunk)
+        known_hash = hasher.hexdigest()
+        if self.has_object(known_hash):
+            return known_hash, size
+
+        if size >= CHUNKED_OBJECT_MIN_SIZE:
+            return self._store_chunked_from_path(src_path), size
+
+        hasher = new_hasher()
+        size = 0
+        compressor = _new_compressor()
+        fd, tmp_path = _create_temp_object(self._objects_dir_str)
+        try:
+            with open(src_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for chunk in iter_read_chunks(src, CHUNK_SIZE):
+                    hasher.update(chunk)
+                    size += len(chunk)
+                    dst.write(compressor.compress(chunk))
+                dst.write(compressor.flush())
+
+            hash_value = hasher.hexdigest()
+            object_path = self._object_path(hash_value)
+            if os.path.exists(object_path):
+                os.unlink(tmp_path)
+            else:
+                self._record_write(tmp_path, object_path)
+        except BaseException:
+            _remove_if_exists(tmp_path)
+            raise
+
+        return hash_value, size
+
+    def _store_chunked_from_path(self, src_path: Path) -> str:
+        """Store a large file as content-defined chunks and a manifest.
+
+        Each chunk is stored as an ordinary object, so chunks shared with
+        earlier versions of the file are not written again. The manifest is
+        stored under the hash of the whole content, so the file's object ID
+        is the same as if it had been stored in one piece.
+
+        Args:
+            src_path (Path): File to store
+
+        Returns:
+            str: Hash of the stored content
+        """
+        hasher = new_hasher()
+        chunk_hashes = []
+        # The chunks and manifest are flushed together rather than one by one,
+        # and linked in the order they were written, so the manifest never
+        # becomes visible before its chunks
+        with self.batch():
+            with open(src_path, "rb") as src:
+                for chunk in iter_file_chunks(src):
+                    hasher.update(chunk)
+                    chunk_hash = hash_bytes(chunk)
+                    self._store_bytes(chunk_hash, chunk)
+                    chunk_hashes.append(chunk_hash)
+
+            hash_value = hasher.hexdigest()
+            manifest = MANIFEST_MAGIC + "\n".join(chunk_hashes).encode("ascii")
+            self._store_bytes(hash_value, manifest, compress=False)
+
+        logger.debug("Stored %s as %s chunks", src_path, len(chunk_hashes))
         return hash_value
 
     def get_object(self, hash_value: str) -> Optional[str]:
@@ -42,8 +399,192 @@ class ObjectStore:
         Returns:
             Optional[str]: Content if found, None otherwise
         """
-        object_path = self.objects_dir / hash_value
-        return read_text_file(object_path)
+        data = self._read_object_bytes(hash_value)
+        if data is None:
+            return None
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return None
+
+    def _read_object_bytes(self, hash_value: str) -> Optional[bytearray]:
+        """Read an object's full uncompressed content.
+
+        Decompressed pieces are appended to one growing buffer as they are
+        produced, so peak memory is the content plus a single chunk rather
+        than every piece plus their joined copy.
+
+        Args:
+            hash_value (str): Hash of the content
+
+        Returns:
+            Optional[bytearray]: Content if found and readable, None otherwise
+        """
+        try:
+            content = bytearray()
+            for chunk in self._iter_object_chunks(hash_value):
+                content += chunk
+            return content
+        except FileNotFoundError:
+            return None
+        except zlib.error as e:
+            logger.error(f"Corrupt object {hash_value}: {str(e)}")
+            return None
+
+    def _iter_object_chunks(self, hash_value: str) -> Iterator[bytes]:
+        """Yield an object's uncompressed content in chunks.
+
+        Args:
+            hash_value (str): Hash of the content
+
+        Yields:
+            bytes: Successive pieces of the content
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+            zlib.error: If a compressed object is corrupt or truncated
+        """
+        try:
+            f = open(self._object_path(hash_value), "rb")
+        except FileNotFoundError:
+            legacy_path = self._legacy_object_path(hash_value)
+            if legacy_path is None:
+                raise
+            f = open(legacy_path, "rb")
+
+        with f:
+            head = f.read(len(MANIFEST_MAGIC))
+
+            if head == MANIFEST_MAGIC:
+                manifest = f.read().decode("ascii")
+                for chunk_hash in manifest.split("\n"):
+                    yield from self._iter_object_chunks(chunk_hash)
+                return
+
+            # The stored bytes are fed to the decompressor as slices of a
+            # memory map rather than as freshly read bytes objects
+            mapped = iter_mapped_chunks(f, CHUNK_SIZE)
+            try:
+                # Stored uncompressed by an earlier version
+                if not head.startswith(GZIP_MAGIC):
+                    for chunk in mapped:
+                        yield bytes(chunk)
+                    return
+
+                decompressor = zlib.decompressobj(GZIP_WBITS)
+                for chunk in mapped:
+                    yield decompressor.decompress(chunk)
+                yield decompressor.flush()
+            finally:
+                mapped.close()
+
+            if not decompressor.eof:
+                raise zlib.error(f"Truncated object {hash_value}")
+
+    def has_object(self, hash_value: str) -> bool:
+        """Check whether an object is present in the store.
+
+        Args:
+            hash_value (str): Hash of the content
+
+        Returns:
+            bool: True if the object exists
+        """
+        if os.path.exists(self._object_path(hash_value)):
+            return True
+        legacy_path = self._legacy_object_path(hash_value)
+        return legacy_path is not None and os.path.exists(legacy_path)
+
+    def checkout_object(self, hash_value: str, dest_path: Path) -> bool:
+        """Copy an object's content to a path in the working tree.
+
+        The content is streamed out of the store chunk by chunk rather than
+        decoded into a string. Objects are copied rather than hardlinked so
+        edits in the working tree can never alter the store.
+
+        Args:
+            hash_value (str): Hash of the content
+            dest_path (Path): Destination file path
+
+        Returns:
+            bool: True if the object was found and copied
+        """
+        ensure_dir(dest_path.parent)
+        return self._copy_object(hash_value, dest_path)
+
+    def _copy_object(self, hash_value: str, dest_path: Union[str, Path]) -> bool:
+        """Copy an object to a path whose parent directory already exists.
+
+        A symlink is written through, so the file it points to is restored.
+        A file with other hardlinks (such as a backup taken before a restore)
+        is swapped for a new file with the same mode, so the other links keep
+        the old content. Any other file is overwritten in place, keeping its
+        mode and ownership.
+        """
+        if not self.has_object(hash_value):
+            return False
+
+        try:
+            dest_stat = os.lstat(dest_path)
+        except FileNotFoundError:
+            dest_stat = None
+        if dest_stat is not None and stat.S_ISLNK(dest_stat.st_mode):
+            dest_path = os.path.realpath(dest_path)
+            try:
+                dest_stat = os.stat(dest_path)
+            except FileNotFoundError:
+                dest_stat = None
+
+        if dest_stat is None or dest_stat.st_nlink <= 1:
+            with open(dest_path, "wb") as dst:
+                for chunk in self._iter_object_chunks(hash_value):
+                    dst.write(chunk)
+            return True
+
+        tmp_path = f"{dest_path}.pygrits-tmp"
+        try:
+            with open(tmp_path, "wb") as dst:
+                for chunk in self._iter_object_chunks(hash_value):
+                    dst.write(chunk)
+            shutil.copymode(dest_path, tmp_path)
+            os.replace(tmp_path, dest_path)
+        except BaseException:
+            _remove_if_exists(tmp_path)
+            raise
+        return True
+
+    def iter_object_lines(self, hash_value: str) -> Iterator[str]:
+        """Lazily yield the lines of an object, keeping line endings.
+
+        The object is streamed and decoded one line at a time, so the whole
+        content is never held as a single string.
+
+        Args:
+            hash_value (str): Hash of the content
+
+        Yields:
+            str: Decoded lines of the object
+
+        Raises:
+            FileNotFoundError: If the object does not exist
+        """
+        # Chunks of a line still being read; they are joined only once a
+        # newline arrives, so long lines are not re-copied for every chunk
+        pending: List[bytes] = []
+        for chunk in self._iter_object_chunks(hash_value):
+            if chunk.rfind(b"\n") == -1:
+                pending.append(chunk)
+                continue
+
+            pending.append(chunk)
+            lines = b"".join(pending).splitlines(keepends=True)
+            # Hold back a trailing partial line until the next chunk arrives
+            pending = [lines.pop()] if not lines[-1].endswith(b"\n") else []
+            for line in lines:
+                yield line.decode("utf-8", errors="replace")
+        if pending:
+            for line in b"".join(pending).splitlines(keepends=True):
+                yield line.decode("utf-8", errors="replace")
 
     def create_commit(
         self, message: str, files: Dict[str, Any], parent: str = ""
@@ -59,14 +600,49 @@ class ObjectStore:
             str: Hash of the new commit
         """
         commit_data = {
+            "version": COMMIT_FORMAT_VERSION,
             "parent": parent,
+            "generation": self._next_generation(parent),
             "timestamp": datetime.now().isoformat(),
             "message": message.strip(),
-            "files": files,
+            # Copied so later changes to the caller's dict cannot reach the
+            # cached commit below
+            "files": dict(files),
         }
 
-        commit_content = json.dumps(commit_data, indent=2, sort_keys=True)
-        return self.store_object(commit_content)
+        # Sorted keys keep the encoding, and so the hash, deterministic
+        commit_content = json.dumps(commit_data, separators=(",", ":"), sort_keys=True)
+        commit_hash = self.store_object(commit_content)
+
+        # Commits are immutable, so the dict just encoded is exactly what
+        # get_commit would parse back; log after commit then skips the read
+        self._commit_cache.put(commit_hash, commit_data)
+
+        try:
+            self.update_commit_graph(commit_hash)
+        except OSError as e:
+            # The graph only speeds up history walks; log falls back without it
+            logger.warning(f"Could not update commit graph: {str(e)}")
+
+        return commit_hash
+
+    def _next_generation(self, parent: str) -> int:
+        """Get the generation number for a new commit with the given parent."""
+        if not parent:
+            return 1
+
+        entry = self.read_commit_graph().get(parent)
+        if entry is None:
+            try:
+                self.update_commit_graph(parent)
+            except OSError as e:
+                logger.warning(f"Could not update commit graph: {str(e)}")
+            entry = self.read_commit_graph().get(parent)
+        if entry is not None:
+            return entry[1] + 1
+
+        parent_data = self.get_commit(parent) or {}
+        return parent_data.get("generation", 0) + 1
 
     def get_commit(self, commit_hash: str) -> Optional[Dict[str, Any]]:
         """Get commit data by hash.
@@ -77,37 +653,210 @@ class ObjectStore:
         Returns:
             Optional[Dict[str, Any]]: Commit data if found, None otherwise
         """
-        content = self.get_object(commit_hash)
+        commit_data = self._commit_cache.get(commit_hash)
+        if commit_data is not None:
+            return commit_data
+
+        # Read directly so the raw text isn't cached alongside the parsed dict
+        content = self._read_object_bytes(commit_hash)
         if content:
             try:
-                return json.loads(content)
-            except json.JSONDecodeError:
+                commit_data = json.loads(content)
+                self._commit_cache.put(commit_hash, commit_data)
+                return commit_data
+            except (json.JSONDecodeError, UnicodeDecodeError):
                 logger.error(f"Invalid commit format: {commit_hash}")
         return None
 
-    def restore_files(self, commit_data: Dict[str, Any], repo_path: Path) -> None:
+    def read_commit_graph(self) -> Dict[str, CommitGraphEntry]:
+        """Load the commit graph, reusing the parsed copy while it is unchanged.
+
+        A trailing partial record, left by an interrupted append, is ignored.
+
+        Returns:
+            Dict[str, CommitGraphEntry]: Commit hash to (parent, generation,
+                timestamp in microseconds); empty if there is no graph yet
+        """
+        try:
+            size = os.path.getsize(self._commit_graph_path)
+        except FileNotFoundError:
+            size = 0
+        if size == self._commit_graph_size:
+            return self._commit_graph
+
+        graph: Dict[str, CommitGraphEntry] = {}
+        if size:
+            with open(self._commit_graph_path, "rb") as f:
+                data = f.read(size - size % COMMIT_GRAPH_RECORD.size)
+            for commit, parent, generation, timestamp in COMMIT_GRAPH_RECORD.iter_unpack(data):
+                parent_hash = parent.hex() if parent != NULL_DIGEST else ""
+                graph[commit.hex()] = (parent_hash, generation, timestamp)
+
+        self._commit_graph = graph
+        self._commit_graph_size = size
+        return graph
+
+    def update_commit_graph(self, tip: str) -> int:
+        """Add a commit and any of its ancestors missing from the commit graph.
+
+        Walks parents from tip until it reaches a commit the graph already
+        knows, then appends the new records oldest first so each generation
+        number can be derived from its parent's.
+
+        Args:
+            tip (str): Hash of the newest commit to record
+
+        Returns:
+            int: Number of commits added to the graph
+        """
+        graph = self.read_commit_graph()
+
+        missing = []
+        commit_hash = tip
+        while commit_hash and commit_hash not in graph:
+            commit_data = self.get_commit(commit_hash)
+            if not commit_data:
+                # Generations can't be computed past a gap in history
+                logger.warning(f"Commit graph not updated, missing commit: {commit_hash}")
+                return 0
+            missing.append((commit_hash, commit_data))
+            commit_hash = commit_data.get("parent", "")
+        if not missing:
+            return 0
+
+        generation = graph[commit_hash][1] if commit_hash else 0
+        records = []
+        for commit_hash, commit_data in reversed(missing):
+            generation += 1
+            parent = commit_data.get("parent", "")
+            records.append(
+                COMMIT_GRAPH_RECORD.pack(
+                    bytes.fromhex(commit_hash),
+                    bytes.fromhex(parent) if parent else NULL_DIGEST,
+                    generation,
+                    _timestamp_micros(commit_data.get("timestamp", "")),
+                )
+            )
+
+        ensure_dir(Path(self._commit_graph_path).parent)
+        with open(self._commit_graph_path, "ab") as f:
+            # Drop a partial record so new ones stay aligned
+            end = f.seek(0, os.SEEK_END)
+            if end % COMMIT_GRAPH_RECORD.size:
+                f.truncate(end - end % COMMIT_GRAPH_RECORD.size)
+            f.write(b"".join(records))
+
+        logger.debug("Added %s commits to the commit graph", len(records))
+        return len(records)
+
+    def iter_history(
+        self, tip: str, max_entries: Optional[int] = None
+    ) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Yield commits from tip back through their parents.
+
+        When tip is in the commit graph the whole chain is known up front, so
+        commit objects are read ahead in parallel instead of one at a time,
+        each read waiting on the previous one to learn the next hash. At most
+        HISTORY_READ_AHEAD reads (fewer if max_entries is smaller) are in
+        flight beyond the commit being yielded.
+
+        Args:
+            tip (str): Hash of the commit to start from
+            max_entries (Optional[int], optional): Maximum number of commits
+                to yield. Defaults to None (no limit).
+
+        Yields:
+            Tuple[str, Optional[Dict[str, Any]]]: Commit hash and its data, or
+                None as the last item if a commit could not be read
+        """
+        graph = self.read_commit_graph()
+
+        chain = []
+        commit_hash = tip
+        while commit_hash in graph and (max_entries is None or len(chain) < max_entries):
+            chain.append(commit_hash)
+            commit_hash = graph[commit_hash][0]
+
+        if chain:
+            read_ahead = min(len(chain), HISTORY_READ_AHEAD)
+            to_read = iter(chain)
+            with ThreadPoolExecutor(
+                max_workers=min(HISTORY_WORKERS, read_ahead)
+            ) as executor:
+                in_flight = deque(
+                    (chain_hash, executor.submit(self.get_commit, chain_hash))
+                    for chain_hash in islice(to_read, read_ahead)
+                )
+                try:
+                    while in_flight:
+                        chain_hash, future = in_flight.popleft()
+                        commit_data = future.result()
+                        next_hash = next(to_read, None)
+                        if next_hash is not None:
+                            in_flight.append(
+                                (next_hash, executor.submit(self.get_commit, next_hash))
+                            )
+
+                        yield chain_hash, commit_data
+                        if not commit_data:
+                            return
+                finally:
+                    # Stopped early: drop reads that have not started
+                    for _, future in in_flight:
+                        future.cancel()
+
+        # Commits not in the graph are followed one parent at a time
+        count = len(chain)
+        while commit_hash and (max_entries is None or count < max_entries):
+            commit_data = self.get_commit(commit_hash)
+            yield commit_hash, commit_data
+            if not commit_data:
+                return
+            commit_hash = commit_data.get("parent", "")
+            count += 1
+
+    def restore_files(self, commit_data: Dict[str, Any], repo_path: Path) -> int:
         """Restore files from a commit to the working directory.
 
+        Parent directories are created once each up front, then files are
+        copied out of the store on a thread pool so their I/O overlaps.
+
         Args:
             commit_data (Dict[str, Any]): Commit data containing files to restore
             repo_path (Path): Repository root path
+
+        Returns:
+            int: Number of files restored
         """
         try:
             files = commit_data.get("files", {})
-            for file_path, file_info in files.items():
-                full_path = repo_path / file_path
-                content = self.get_object(file_info["hash"])
+            repo_path_str = str(repo_path)
+            items = [
+                (file_path, file_info["hash"], os.path.join(repo_path_str, file_path))
+                for file_path, file_info in files.items()
+            ]
 
-                if content is None:
+            for directory in {os.path.dirname(full_path) for _, _, full_path in items}:
+                os.makedirs(directory, exist_ok=True)
+
+            with ThreadPoolExecutor(max_workers=RESTORE_WORKERS) as executor:
+                results = list(
+                    executor.map(
+                        self._copy_object,
+                        [hash_value for _, hash_value, _ in items],
+                        [full_path for _, _, full_path in items],
+                    )
+                )
+
+            restored = 0
+            for (file_path, _, _), found in zip(items, results):
+                if not found:
                     logger.error(f"Could not find content for {file_path}")
                     continue
+                restored += 1
+                logger.debug("Restored %s", file_path)
 
-                # Create directory if it doesn't exist
-                ensure_dir(full_path.parent)
-
-                # Write file content
-                write_text_file(full_path, content)
-                logger.debug(f"Restored {file_path}")
+            return restored
 
         except Exception as e:
             logger.error(f"Failed to restore files: {str(e)}")
@@ -126,3 +875,106 @@ class ObjectStore:
         if commit_data:
             return set(commit_data.get("files", {}).keys())
         return set()
+
+
+def _timestamp_micros(timestamp: str) -> int:
+    """Convert a commit's ISO timestamp to microseconds since the epoch."""
+    try:
+        return round(datetime.fromisoformat(timestamp).timestamp() * 1_000_000)
+    except ValueError:
+        return 0
+
+
+def _new_compressor() -> "zlib._Compress":
+    """Create a streaming compressor producing gzip-framed object data."""
+    return zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, GZIP_WBITS)
+
+
+def _compress(data: bytes) -> bytes:
+    """Compress a complete object in one call."""
+    compressor = _new_compressor()
+    return compressor.compress(data) + compressor.flush()
+
+
+def _create_temp_object(directory: str) -> Tuple[int, str]:
+    """Create a temporary file for a new object, with the usual file mode.
+
+    Args:
+        directory (str): Directory to create the file in
+
+    Returns:
+        Tuple[int, str]: Open file descriptor and path of the temporary file
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    try:
+        os.chmod(tmp_path, OBJECT_FILE_MODE)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    return fd, tmp_path
+
+
+def _publish_object(tmp_path: str, object_path: str) -> bool:
+    """Give a flushed temporary file its object name unless that is taken.
+
+    Linking refuses to overwrite, so an existing object is kept and the
+    temporary file is dropped. The shard directory is created if needed.
+
+    Args:
+        tmp_path (str): Fully written temporary file
+        object_path (str): Path the object belongs at
+
+    Returns:
+        bool: True if the object was created, False if it already existed
+    """
+    try:
+        created = _link_object(tmp_path, object_path)
+    except FileNotFoundError:
+        # First object in this shard
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        created = _link_object(tmp_path, object_path)
+
+    if created is not None:
+        os.unlink(tmp_path)
+        return created
+
+    # Hardlinks are unsupported here; an object that appeared meanwhile
+    # holds identical content, so replacing it is harmless
+    os.replace(tmp_path, object_path)
+    return True
+
+
+def _link_object(tmp_path: str, object_path: str) -> Optional[bool]:
+    """Hardlink a temporary file to its object path.
+
+    Returns:
+        Optional[bool]: True if linked, False if the object already exists,
+            None if the filesystem does not support hardlinks
+    """
+    try:
+        os.link(tmp_path, object_path)
+        return True
+    except FileExistsError:
+        return False
+    except FileNotFoundError:
+        raise
+    except OSError:
+        return None
+
+
+def _remove_if_exists(path: str) -> None:
+    """Delete a file, ignoring one that is already gone."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _fsync_file(path: str) -> None:
+    """Flush a file's data to disk."""
+    fd = os.open(path, os.O_RDWR | getattr(os, "O_BINARY", 0))
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
@@ -2,20 +2,43 @@
 repository.py: Main repository management class for PyGrits.
 """
 
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional
-import difflib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from colorama import Fore, Style
 
 from app.utils.logger import logger
-from app.utils.file_utils import ensure_dir, get_relative_path
-from app.utils.hash_utils import hash_file
-from app.core.objects import ObjectStore
+from app.utils.file_utils import (
+    ensure_dir,
+    get_relative_path,
+    link_or_copy,
+    snapshot_tree,
+    write_text_file,
+)
+from app.core.objects import CommitGraphEntry, ObjectStore
 from app.core.index import Index
 import shutil
 
+# Color for each kind of unified diff line, keyed by its first character
+DIFF_LINE_COLORS = {"+": Fore.GREEN, "-": Fore.RED, "@": Fore.CYAN}
+
 
 class Repository:
+    __slots__ = (
+        "path",
+        "_path_str",
+        "vcs_dir",
+        "objects_dir",
+        "head_file",
+        "index_file",
+        "object_store",
+        "index",
+        "_initialized",
+        "log_file",
+    )
+
     def __init__(self, path: str = "."):
         """Initialize a new repository object.
 
@@ -23,6 +46,7 @@ class Repository:
             path (str, optional): Path to the repository. Defaults to ".".
         """
         self.path = Path(path).resolve()
+        self._path_str = str(self.path) + os.sep
         self.vcs_dir = self.path / ".pygrits"
         self.objects_dir = self.vcs_dir / "objects"
         self.head_file = self.vcs_dir / "HEAD"
@@ -41,12 +65,12 @@ class Repository:
             ensure_dir(self.log_file.parent)
 
     def _check_initialized(self) -> bool:
-        """Check if the repository is initialized."""
-        return (
-            self.vcs_dir.exists()
-            and self.objects_dir.exists()
-            and self.head_file.exists()
-        )
+        """Check if the repository is initialized.
+
+        init() creates HEAD only after the directory structure, so HEAD
+        existing implies the rest does too and one stat is enough.
+        """
+        return os.path.exists(self.head_file)
 
     def init(self) -> None:
         """Initialize a new repository."""
@@ -57,6 +81,7 @@ class Repository:
         try:
             # Create directory structure
             ensure_dir(self.objects_dir)
+            self.object_store.ensure_sharded()
             self.head_file.touch(exist_ok=False)
 
             # Initialize empty index
@@ -76,31 +101,135 @@ class Repository:
             raise ValueError("Repository not initialized")
 
         try:
-            file_path = Path(file_path).resolve()
-
-            # Validation checks
-            if not file_path.exists():
-                logger.error(f"File not found: {file_path}")
-                raise FileNotFoundError(f"File not found: {file_path}")
+            file_path = self._resolve_add_path(file_path)
+            self.object_store.ensure_sharded()
 
-            if not str(file_path).startswith(str(self.path)):
-                logger.error("File is outside repository")
-                raise ValueError("File is outside repository")
-
-            # Hash file and store content
-            file_hash, content = hash_file(file_path)
-            self.object_store.store_object(content)
+            # Hash file and stream its content into the object store
+            file_hash, file_size = self.object_store.store_object_from_path(
+                file_path
+            )
 
             # Update index
-            self.index.add_file(file_path, file_hash, self.path)
+            rel_path = str(file_path)[len(self._path_str):]
+            self.index.add_file(rel_path, file_hash, file_size)
 
-            logger.info(f"Added file: {file_path.relative_to(self.path)}")
-            logger.debug(f"File hash: {file_hash}")
+            logger.info(f"Added file: {rel_path}")
+            logger.debug("File hash: %s", file_hash)
 
         except Exception as e:
             logger.error(f"Failed to add file: {str(e)}")
             raise
 
+    def add_many(self, file_paths: List[str]) -> None:
+        """Add several files to the staging area.
+
+        Files are hashed and stored concurrently, then recorded in the index
+        with a single write.
+
+        Args:
+            file_paths: Paths of the files to add
+        """
+        if not self._initialized:
+            logger.error("Repository not initialized")
+            raise ValueError("Repository not initialized")
+
+        try:
+            checked_dirs: Set[str] = set()
+            resolved = [
+                self._resolve_add_path(file_path, checked_dirs)
+                for file_path in file_paths
+            ]
+            # Repositories from earlier versions are migrated on first write
+            self.object_store.ensure_sharded()
+
+            # Object files are content-addressed, so concurrent stores are safe
+            # Flush every new object to disk before the index refers to them
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+            with self.object_store.batch(), ThreadPoolExecutor(
+                max_workers=max_workers
+            ) as executor:
+                stored = list(
+                    executor.map(self.object_store.store_object_from_path, resolved)
+                )
+
+            with self.index.open():
+                for file_path, (file_hash, file_size) in zip(resolved, stored):
+                    rel_path = str(file_path)[len(self._path_str):]
+                    self.index.add_file_cached(rel_path, file_hash, file_size)
+                    logger.info(f"Added file: {rel_path}")
+                    logger.debug("File hash: %s", file_hash)
+
+        except Exception as e:
+            logger.error(f"Failed to add files: {str(e)}")
+            raise
+
+    def _resolve_add_path(
+        self, file_path: str, checked_dirs: Optional[Set[str]] = None
+    ) -> Path:
+        """Resolve a path to add and check that it is a file in the repository.
+
+        The path is made absolute lexically, which needs no syscalls and still
+        collapses '..' components. A path that then appears to lie outside the
+        repository is resolved through symlinks, in case it reaches the
+        repository by another route. One that appears inside is checked only
+        where a symlink could lead it out: see _links_stay_inside. Existence
+        is not checked here: opening the file to hash it raises
+        FileNotFoundError for a missing path.
+
+        Args:
+            file_path (str): Path to check
+            checked_dirs (Optional[Set[str]], optional): Directories already
+                known to resolve inside the repository, shared between calls
+                for one command. Defaults to None.
+
+        Returns:
+            Path: Absolute path of the file
+
+        Raises:
+            ValueError: If the path leads outside the repository
+        """
+        absolute = os.path.abspath(file_path)
+        if absolute.startswith(self._path_str):
+            inside = self._links_stay_inside(absolute, checked_dirs)
+        else:
+            absolute = os.path.realpath(absolute)
+            inside = absolute.startswith(self._path_str)
+
+        if not inside:
+            logger.error("File is outside repository")
+            raise ValueError("File is outside repository")
+
+        return Path(absolute)
+
+    def _links_stay_inside(
+        self, absolute: str, checked_dirs: Optional[Set[str]] = None
+    ) -> bool:
+        """Check that symlinks on a path inside the repository keep it inside.
+
+        The path's directory is resolved once per directory rather than once
+        per file, and the file itself only if it is a symlink, so a command
+        touching many files in a few directories costs one lstat per file.
+        """
+        parent = os.path.dirname(absolute)
+        if checked_dirs is None or parent not in checked_dirs:
+            if not (os.path.realpath(parent) + os.sep).startswith(self._path_str):
+                return False
+            if checked_dirs is not None:
+                checked_dirs.add(parent)
+
+        if os.path.islink(absolute):
+            return os.path.realpath(absolute).startswith(self._path_str)
+        return True
+
+    def _index_key(self, file_path: str, checked_dirs: Optional[Set[str]] = None) -> str:
+        """Get the key a path has in the index and in commits.
+
+        The key is the path relative to the repository root. It is found with
+        the same checks as _resolve_add_path, so restoring never writes
+        through a symlink to a file outside the repository.
+        """
+        return str(self._resolve_add_path(file_path, checked_dirs))[len(self._path_str):]
+
     def get_head(self) -> str:
         """Get the current HEAD commit hash."""
         if not self._initialized:
@@ -113,8 +242,12 @@ class Repository:
             return ""
 
     def set_head(self, commit_hash: str) -> None:
-        """Set the current HEAD commit hash."""
-        self.head_file.write_text(commit_hash)
+        """Set the current HEAD commit hash.
+
+        HEAD is replaced atomically and flushed to disk, so after a crash it
+        names either the old commit or the new one, never a torn hash.
+        """
+        write_text_file(self.head_file, commit_hash, durable=True)
 
     def create_commit(self, message: str) -> str:
         """Create a new commit with staged changes."""
@@ -133,6 +266,7 @@ class Repository:
                 logger.warning("No files staged for commit")
                 raise ValueError("No files staged for commit")
 
+            self.object_store.ensure_sharded()
             commit_hash = self.object_store.create_commit(
                 message=message, files=staged_files, parent=self.get_head()
             )
@@ -142,7 +276,7 @@ class Repository:
             self.index.clear()
 
             logger.info(f"Created commit: {commit_hash[:8]}")
-            logger.debug(f"Full commit hash: {commit_hash}")
+            logger.debug("Full commit hash: %s", commit_hash)
             return commit_hash
 
         except Exception as e:
@@ -160,10 +294,9 @@ class Repository:
             logger.info("No commits yet")
             return
 
-        count = 0
-        while current_commit and (max_entries is None or count < max_entries):
+        history = self.object_store.iter_history(current_commit, max_entries)
+        for current_commit, commit_data in history:
             try:
-                commit_data = self.object_store.get_commit(current_commit)
                 if not commit_data:
                     break
 
@@ -174,13 +307,58 @@ class Repository:
                     f"{'-' * 50}"
                 )
 
-                current_commit = commit_data.get("parent", "")
-                count += 1
-
             except Exception as e:
                 logger.error(f"Error reading commit {current_commit}: {str(e)}")
                 break
 
+    def is_ancestor(self, ancestor: str, descendant: str) -> bool:
+        """Check whether a commit is reachable from another through its parents.
+
+        Walks back from descendant and stops as soon as generation numbers
+        drop to the ancestor's, so unrelated or newer commits are rejected
+        without walking the rest of the history. A commit counts as its own
+        ancestor.
+
+        Args:
+            ancestor (str): Hash of the possible ancestor
+            descendant (str): Hash of the commit to walk back from
+
+        Returns:
+            bool: True if ancestor is descendant or one of its ancestors
+        """
+        graph = self.object_store.read_commit_graph()
+
+        ancestor_node = self._commit_node(ancestor, graph)
+        if ancestor_node is None:
+            return False
+        # Commits from older releases may lack a generation; never cut off then
+        cutoff = ancestor_node[1] or 0
+
+        commit_hash = descendant
+        while commit_hash:
+            if commit_hash == ancestor:
+                return True
+            node = self._commit_node(commit_hash, graph)
+            if node is None:
+                return False
+            parent, generation = node
+            if generation is not None and generation <= cutoff:
+                return False
+            commit_hash = parent
+        return False
+
+    def _commit_node(
+        self, commit_hash: str, graph: Dict[str, CommitGraphEntry]
+    ) -> Optional[Tuple[str, Optional[int]]]:
+        """Get a commit's parent and generation, preferring the commit graph."""
+        entry = graph.get(commit_hash)
+        if entry is not None:
+            return entry[0], entry[1]
+        commit_data = self.object_store.get_commit(commit_hash)
+        if not commit_data:
+            return None
+        return commit_data.get("parent", ""), commit_data.get("generation")
+
     def show_commit_diff(self, commit_hash: str) -> None:
         """Show changes introduced by a commit."""
         try:
@@ -197,58 +375,80 @@ class Repository:
                 f"Message: {commit_data['message']}\n"
             )
 
+            # Load the parent's file list once rather than once per file
+            parent_files = {}
+            if parent_hash:
+                parent_commit = self.object_store.get_commit(parent_hash)
+                if parent_commit:
+                    parent_files = parent_commit.get("files", {})
+
             changed_files = commit_data.get("files", {})
-            for file_path in changed_files:
-                current_content = self.object_store.get_object(
-                    changed_files[file_path]["hash"]
-                )
+            for file_path, entry in changed_files.items():
+                parent_entry = parent_files.get(file_path)
+                if parent_entry and parent_entry["hash"] == entry["hash"]:
+                    # Same object on both sides; nothing to read or diff
+                    continue
+
+                current_lines = self.object_store.iter_object_lines(entry["hash"])
 
                 # Get parent content if available
-                parent_content = ""
-                if parent_hash:
-                    parent_commit = self.object_store.get_commit(parent_hash)
-                    if parent_commit and file_path in parent_commit["files"]:
-                        parent_content = self.object_store.get_object(
-                            parent_commit["files"][file_path]["hash"]
-                        )
+                parent_lines = []
+                if parent_entry:
+                    parent_lines = self.object_store.iter_object_lines(
+                        parent_entry["hash"]
+                    )
 
-                self._show_file_diff(file_path, parent_content, current_content)
+                self._show_file_diff(file_path, parent_lines, current_lines)
 
         except Exception as e:
             logger.error(f"Error showing diff: {str(e)}")
             raise
 
     def _show_file_diff(
-        self, file_path: str, old_content: str, new_content: str
+        self, file_path: str, old_lines: Iterable[str], new_lines: Iterable[str]
     ) -> None:
-        """Show diff for a single file."""
-        if not old_content:
-            logger.info(f"\n{Fore.CYAN}New file: {file_path}{Style.RESET_ALL}")
-            for line in new_content.splitlines():
-                logger.info(f"{Fore.GREEN}+ {line}{Style.RESET_ALL}")
+        """Show diff for a single file given the lines of both versions."""
+        # Off a terminal colorama would only strip the codes out again
+        use_color = sys.stdout.isatty()
+        colors = DIFF_LINE_COLORS if use_color else {}
+        header = Fore.CYAN if use_color else ""
+        reset = Style.RESET_ALL if use_color else ""
+
+        old_lines = list(old_lines)
+        if not old_lines:
+            logger.info(f"\n{header}New file: {file_path}{reset}")
+            # One log call for the whole file rather than one per line
+            added_color = colors.get("+", "")
+            stripped = (line.rstrip("\r\n") for line in new_lines)
+            added = [f"{added_color}+ {line}{reset}" for line in stripped]
+            if added:
+                logger.info("\n".join(added))
             return
 
+        # Deferred so commands that never diff skip loading difflib
+        from app.utils.diff_utils import unified_diff
+
         diff = list(
-            difflib.unified_diff(
-                old_content.splitlines(keepends=True),
-                new_content.splitlines(keepends=True),
+            unified_diff(
+                old_lines,
+                list(new_lines),
                 fromfile=f"a/{file_path}",
                 tofile=f"b/{file_path}",
-                lineterm="",
             )
         )
 
         if diff:
-            logger.info(f"\n{Fore.CYAN}Modified: {file_path}{Style.RESET_ALL}")
+            logger.info(f"\n{header}Modified: {file_path}{reset}")
+            rendered = []
             for line in diff:
-                if line.startswith("+"):
-                    print(f"{Fore.GREEN}{line}{Style.RESET_ALL}")
-                elif line.startswith("-"):
-                    print(f"{Fore.RED}{line}{Style.RESET_ALL}")
-                elif line.startswith("@"):
-                    print(f"{Fore.CYAN}{line}{Style.RESET_ALL}")
-                else:
-                    print(line)
+                # Content lines keep their own newline; the join supplies it
+                line = line.rstrip("\r\n")
+                color = colors.get(line[:1])
+                rendered.append(f"{color}{line}{reset}" if color else line)
+
+            # Emit the whole diff with a single write
+            sys.stdout.write("\n".join(rendered) + "\n")
+            sys.stdout.flush()
 
     def restore(self, paths: List[str], source: Optional[str] = None, staged: bool = False) -> None:
         """Restore files to their state in a previous commit or staging area.
@@ -278,16 +478,16 @@ class Repository:
         """Restore files from staging area."""
         staged_files = self.index.get_staged_files()
         restored = 0
+        checked_dirs: Set[str] = set()
 
         for path in paths:
-            rel_path = str(Path(path).resolve().relative_to(self.path))
+            rel_path = self._index_key(path, checked_dirs)
             if rel_path not in staged_files:
                 logger.warning(f"File {path} not in staging area")
                 continue
 
             file_info = staged_files[rel_path]
-            content = self.object_store.get_object(file_info["hash"])
-            if content is None:
+            if not self.object_store.has_object(file_info["hash"]):
                 logger.error(f"Could not find content for {path}")
                 continue
 
@@ -297,7 +497,7 @@ class Repository:
                 self._backup_file(file_path)
 
             # Restore file
-            file_path.write_text(content, encoding='utf-8')
+            self.object_store.checkout_object(file_info["hash"], file_path)
             restored += 1
             logger.info(f"Restored {path} from staging area")
 
@@ -319,15 +519,15 @@ class Repository:
             raise ValueError(f"Commit {source} not found")
 
         restored = 0
+        checked_dirs: Set[str] = set()
         for path in paths:
-            rel_path = str(Path(path).resolve().relative_to(self.path))
+            rel_path = self._index_key(path, checked_dirs)
             if rel_path not in commit_data["files"]:
                 logger.warning(f"File {path} not found in commit {source}")
                 continue
 
             file_info = commit_data["files"][rel_path]
-            content = self.object_store.get_object(file_info["hash"])
-            if content is None:
+            if not self.object_store.has_object(file_info["hash"]):
                 logger.error(f"Could not find content for {path}")
                 continue
 
@@ -337,8 +537,7 @@ class Repository:
                 self._backup_file(file_path)
 
             # Restore file
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            file_path.write_text(content, encoding='utf-8')
+            self.object_store.checkout_object(file_info["hash"], file_path)
             restored += 1
             logger.info(f"Restored {path} from commit {source[:8]}")
 
@@ -356,22 +555,32 @@ class Repository:
             raise ValueError("No commits to restore from")
 
         try:
-            # Backup current working directory
-            backup_dir = self.vcs_dir / "backup" / "working_tree"
-            if backup_dir.exists():
-                shutil.rmtree(backup_dir)
-            shutil.copytree(self.path, backup_dir, ignore=lambda d, f: ['.pygrits'])
-
             # Get HEAD commit
             commit_data = self.object_store.get_commit(head)
             if not commit_data:
                 raise ValueError(f"Could not read HEAD commit {head}")
 
+            # Backup current working directory. Tracked files are hardlinked
+            # rather than copied; they are unlinked and written anew below, so
+            # the links keep the old contents. Untracked files stay in place
+            # and may be edited later, so they are copied
+            backup_dir = self.vcs_dir / "backup" / "working_tree"
+            if backup_dir.exists():
+                shutil.rmtree(backup_dir)
+            backed_up = snapshot_tree(
+                str(self.path),
+                str(backup_dir),
+                ignore={".pygrits"},
+                replaced=commit_data["files"].keys(),
+            )
+            logger.debug("Backed up %s file(s) to %s", backed_up, backup_dir)
+
             # Remove all tracked files
             self._clean_working_directory(commit_data["files"].keys())
 
             # Restore files from HEAD
-            self._restore_from_commit(list(commit_data["files"].keys()), head)
+            restored = self.object_store.restore_files(commit_data, self.path)
+            logger.info(f"Restored {restored} file(s) from commit {head[:8]}")
 
             # Clear staging area
             self.index.clear()
@@ -387,8 +596,10 @@ class Repository:
         backup_dir = self.vcs_dir / "backup" / "files"
         backup_path = backup_dir / file_path.relative_to(self.path)
         backup_path.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(file_path, backup_path)
-        logger.debug(f"Created backup of {file_path}")
+        if backup_path.exists():
+            backup_path.unlink()
+        link_or_copy(str(file_path), str(backup_path))
+        logger.debug("Created backup of %s", file_path)
 
     def _clean_working_directory(self, tracked_files: List[str]) -> None:
         """Remove tracked files from working directory."""
@@ -396,4 +607,4 @@ class Repository:
             full_path = self.path / file_path
             if full_path.exists():
                 full_path.unlink()
-                logger.debug(f"Removed {file_path}")
\ No newline at end of file
+                logger.debug("Removed %s", file_path)
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+cache_utils.py: Small in-memory caches for immutable repository data.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry.
+
+    Safe to share between threads.
+    """
+
+    def __init__(self, maxsize: int):
+        """Initialize an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of entries to keep
+        """
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Look up a key, marking it as most recently used.
+
+        Args:
+            key (Hashable): Key to look up
+            default (Any, optional): Value returned on a miss. Defaults to None.
+
+        Returns:
+            Any: Cached value, or default if the key is not cached
+        """
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the oldest entry if the cache is full.
+
+        Args:
+            key (Hashable): Key to store under
+            value (Any): Value to cache
+        """
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,67 @@
+"""
+chunk_utils.py: Content-defined chunking used to store large files in pieces.
+"""
+
+import zlib
+from typing import BinaryIO, Iterator
+
+# Chunk size bounds. Boundaries are chosen by content, so an edit only changes
+# the chunks around it and the rest of the file still dedups against earlier
+# versions.
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 256 * 1024
+
+# Candidate boundaries are line breaks; one is taken when the checksum of the
+# bytes just before it has its low bits clear. With typical source lines this
+# averages out near 64 KiB per chunk.
+BOUNDARY_WINDOW = 64
+BOUNDARY_MASK = (1 << 10) - 1
+
+
+def iter_file_chunks(file: BinaryIO) -> Iterator[bytes]:
+    """Split a file into content-defined chunks while reading it.
+
+    A boundary depends only on the bytes up to MAX_CHUNK_SIZE past the
+    chunk's start, so only that much is held in memory at once. The file is
+    read rather than memory-mapped, so one truncated while being read just
+    ends early.
+
+    Args:
+        file (BinaryIO): File opened in binary read mode
+
+    Yields:
+        bytes: Consecutive chunks of the file
+    """
+    buffer = bytearray()
+    at_eof = False
+    while True:
+        while not at_eof and len(buffer) < MAX_CHUNK_SIZE:
+            block = file.read(MAX_CHUNK_SIZE)
+            if block:
+                buffer += block
+            else:
+                at_eof = True
+        if not buffer:
+            return
+
+        end = _find_boundary(buffer, 0, len(buffer))
+        yield bytes(buffer[:end])
+        del buffer[:end]
+
+
+def _find_boundary(data: bytes, start: int, size: int) -> int:
+    """Find where the chunk starting at start ends."""
+    if size - start <= MIN_CHUNK_SIZE:
+        return size
+
+    limit = min(start + MAX_CHUNK_SIZE, size)
+    pos = start + MIN_CHUNK_SIZE
+    while True:
+        newline = data.find(b"\n", pos, limit)
+        if newline < 0:
+            # No natural boundary in range; cut at the maximum size
+            return limit
+        cut = newline + 1
+        if not zlib.crc32(data[cut - BOUNDARY_WINDOW:cut]) & BOUNDARY_MASK:
+            return cut
+        pos = cut
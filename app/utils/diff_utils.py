@@ -0,0 +1,428 @@
+"""
+diff_utils.py: Line-based diffing used to display changes between file versions.
+"""
+
+from bisect import bisect_left
+from typing import Dict, Hashable, Iterator, List, Optional, Sequence, Tuple
+
+# (tag, i1, i2, j1, j2) in the same form as difflib's SequenceMatcher.get_opcodes
+Opcode = Tuple[str, int, int, int, int]
+
+# (i, j, size): a[i:i + size] == b[j:j + size]
+Block = Tuple[int, int, int]
+
+# How far the middle-snake search may go (in edits from each end) before
+# giving up on a region. Past it the region is reported as replaced outright,
+# which keeps diffs of largely rewritten files fast at the cost of a less
+# minimal hunk there.
+MYERS_MAX_COST = 1024
+
+# Lines occurring more often than this in the old version are never used as
+# histogram anchors; regions with no rarer common line fall back to Myers
+HISTOGRAM_MAX_CHAIN = 64
+
+
+def unified_diff(
+    a: Sequence[str],
+    b: Sequence[str],
+    fromfile: str = "",
+    tofile: str = "",
+    n: int = 3,
+) -> Iterator[str]:
+    """Generate a unified diff between two sequences of lines.
+
+    Output is formatted like difflib.unified_diff with lineterm="", but the
+    edits come from a histogram diff rather than difflib's matcher.
+
+    Args:
+        a (Sequence[str]): Lines of the old version
+        b (Sequence[str]): Lines of the new version
+        fromfile (str, optional): Name shown for the old version. Defaults to "".
+        tofile (str, optional): Name shown for the new version. Defaults to "".
+        n (int, optional): Number of context lines. Defaults to 3.
+
+    Yields:
+        str: Lines of the unified diff
+    """
+    started = False
+    for group in _grouped_opcodes(a, b, n):
+        if not started:
+            started = True
+            yield f"--- {fromfile}"
+            yield f"+++ {tofile}"
+
+        first, last = group[0], group[-1]
+        file1_range = _format_range(first[1], last[2])
+        file2_range = _format_range(first[3], last[4])
+        yield f"@@ -{file1_range} +{file2_range} @@"
+
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a[i1:i2]:
+                    yield " " + line
+                continue
+            if tag in ("replace", "delete"):
+                for line in a[i1:i2]:
+                    yield "-" + line
+            if tag in ("replace", "insert"):
+                for line in b[j1:j2]:
+                    yield "+" + line
+
+
+def histogram_opcodes(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Opcode]:
+    """Compute the edits turning a into b with the histogram algorithm.
+
+    Like git's histogram diff, each region is anchored on the longest match
+    around its rarest common line and both sides of the anchor are diffed
+    recursively. Anchoring on rare lines keeps hunks aligned with real
+    changes instead of with repeated lines such as blank lines and braces.
+    Regions without a usable anchor are handed to Myers.
+
+    Lines that do not occur at all in the other version can never match, so
+    they are dropped before the search and come back as plain inserts and
+    deletes. This keeps the Myers fallback's cost proportional to the edits
+    among shared lines rather than to every changed line.
+
+    Args:
+        a (Sequence[Hashable]): Lines of the old version
+        b (Sequence[Hashable]): Lines of the new version
+
+    Returns:
+        List[Opcode]: Opcodes covering both sequences in order
+    """
+    in_a = set(a)
+    in_b = set(b)
+    keep_a = [i for i, line in enumerate(a) if line in in_b]
+    keep_b = [j for j, line in enumerate(b) if line in in_a]
+
+    if len(keep_a) == len(a) and len(keep_b) == len(b):
+        blocks = _histogram_blocks(a, b)
+    else:
+        blocks = _unprune_blocks(
+            _histogram_blocks([a[i] for i in keep_a], [b[j] for j in keep_b]),
+            keep_a,
+            keep_b,
+        )
+    return _blocks_to_opcodes(blocks, len(a), len(b))
+
+
+def _histogram_blocks(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Block]:
+    """Find the sorted matching blocks chosen by the histogram algorithm."""
+    # Ascending positions of each line in a, shared by every region
+    occurrences: Dict[Hashable, List[int]] = {}
+    for i, line in enumerate(a):
+        occurrences.setdefault(line, []).append(i)
+
+    blocks: List[Block] = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = _trim_region(a, b, *regions.pop(), blocks)
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchor = _histogram_anchor(a, alo, ahi, b, blo, bhi, occurrences)
+        if anchor is None:
+            _myers_blocks(a, b, alo, ahi, blo, bhi, blocks)
+            continue
+        i, j, size = anchor
+        blocks.append(anchor)
+        regions.append((alo, i, blo, j))
+        regions.append((i + size, ahi, j + size, bhi))
+
+    blocks.sort()
+    return blocks
+
+
+def _unprune_blocks(
+    blocks: List[Block], keep_a: List[int], keep_b: List[int]
+) -> List[Block]:
+    """Map blocks found on pruned sequences back to original line numbers.
+
+    A block that is contiguous after pruning may span dropped lines in the
+    original, so it is split wherever either side's positions jump.
+    """
+    result: List[Block] = []
+    for i, j, size in blocks:
+        for k in range(size):
+            orig_i = keep_a[i + k]
+            orig_j = keep_b[j + k]
+            if result:
+                last_i, last_j, last_size = result[-1]
+                if last_i + last_size == orig_i and last_j + last_size == orig_j:
+                    result[-1] = (last_i, last_j, last_size + 1)
+                    continue
+            result.append((orig_i, orig_j, 1))
+    return result
+
+
+def _histogram_anchor(
+    a: Sequence[Hashable],
+    alo: int,
+    ahi: int,
+    b: Sequence[Hashable],
+    blo: int,
+    bhi: int,
+    occurrences: Dict[Hashable, List[int]],
+) -> Optional[Block]:
+    """Find the match in a region built around its least frequent common line.
+
+    A match around a line that is unique within the region cannot be beaten
+    on rarity, so the first one found is taken without scanning further.
+
+    Returns:
+        Optional[Block]: Longest match among those with the lowest occurrence
+            count, or None if every common line exceeds HISTOGRAM_MAX_CHAIN
+    """
+
+    def region_count(line: Hashable) -> int:
+        positions = occurrences[line]
+        return bisect_left(positions, ahi) - bisect_left(positions, alo)
+
+    best: Optional[Block] = None
+    best_count = HISTOGRAM_MAX_CHAIN
+    j = blo
+    while j < bhi:
+        positions = occurrences.get(b[j])
+        if positions is None:
+            j += 1
+            continue
+        first = bisect_left(positions, alo)
+        last = bisect_left(positions, ahi)
+        if first == last or last - first > best_count:
+            j += 1
+            continue
+
+        next_j = j + 1
+        for i in positions[first:last]:
+            # Grow the match in both directions
+            start_i, start_j = i, j
+            while start_i > alo and start_j > blo and a[start_i - 1] == b[start_j - 1]:
+                start_i -= 1
+                start_j -= 1
+            end_i, end_j = i + 1, j + 1
+            while end_i < ahi and end_j < bhi and a[end_i] == b[end_j]:
+                end_i += 1
+                end_j += 1
+
+            count = min(region_count(a[k]) for k in range(start_i, end_i))
+            size = end_i - start_i
+            if count < best_count or (
+                count == best_count and (best is None or size > best[2])
+            ):
+                best = (start_i, start_j, size)
+                best_count = count
+                if count == 1:
+                    return best
+            # Lines inside this match cannot start a better one
+            next_j = max(next_j, end_j)
+        j = next_j
+
+    return best
+
+
+def myers_opcodes(a: Sequence[Hashable], b: Sequence[Hashable]) -> List[Opcode]:
+    """Compute the edits turning a into b with Myers' O((N+M)D) algorithm.
+
+    Uses the linear-space divide-and-conquer variant: each region is split
+    at its "middle snake" so no edit graph trace has to be kept.
+
+    Args:
+        a (Sequence[Hashable]): Lines of the old version
+        b (Sequence[Hashable]): Lines of the new version
+
+    Returns:
+        List[Opcode]: Opcodes covering both sequences in order
+    """
+    blocks: List[Block] = []
+    _myers_blocks(a, b, 0, len(a), 0, len(b), blocks)
+    blocks.sort()
+    return _blocks_to_opcodes(blocks, len(a), len(b))
+
+
+def _trim_region(
+    a: Sequence[Hashable],
+    b: Sequence[Hashable],
+    alo: int,
+    ahi: int,
+    blo: int,
+    bhi: int,
+    blocks: List[Block],
+) -> Tuple[int, int, int, int]:
+    """Record a region's common prefix and suffix as matches and strip them."""
+    start = 0
+    while alo + start < ahi and blo + start < bhi and a[alo + start] == b[blo + start]:
+        start += 1
+    if start:
+        blocks.append((alo, blo, start))
+        alo += start
+        blo += start
+    end = 0
+    while alo < ahi - end and blo < bhi - end and a[ahi - end - 1] == b[bhi - end - 1]:
+        end += 1
+    if end:
+        blocks.append((ahi - end, bhi - end, end))
+        ahi -= end
+        bhi -= end
+    return alo, ahi, blo, bhi
+
+
+def _myers_blocks(
+    a: Sequence[Hashable],
+    b: Sequence[Hashable],
+    alo: int,
+    ahi: int,
+    blo: int,
+    bhi: int,
+    blocks: List[Block],
+) -> None:
+    """Append the matching blocks of a minimal (or capped) edit script."""
+    regions = [(alo, ahi, blo, bhi)]
+    while regions:
+        alo, ahi, blo, bhi = _trim_region(a, b, *regions.pop(), blocks)
+        if alo == ahi or blo == bhi:
+            continue
+
+        snake = _middle_snake(a, alo, ahi, b, blo, bhi)
+        if snake is None:
+            continue
+        x, y, u, v = snake
+        if u > x:
+            blocks.append((x, y, u - x))
+        regions.append((alo, x, blo, y))
+        regions.append((u, ahi, v, bhi))
+
+
+def _middle_snake(
+    a: Sequence[Hashable], alo: int, ahi: int, b: Sequence[Hashable], blo: int, bhi: int
+) -> Optional[Tuple[int, int, int, int]]:
+    """Find the middle snake of a[alo:ahi] vs b[blo:bhi].
+
+    Returns:
+        Optional[Tuple[int, int, int, int]]: Absolute (x, y, u, v) where the
+            snake runs from (x, y) to (u, v), or None if the search exceeded
+            MYERS_MAX_COST and the region should be treated as replaced
+    """
+    n = ahi - alo
+    m = bhi - blo
+    delta = n - m
+    odd = delta & 1
+    max_d = (n + m + 1) // 2
+    offset = max_d + 1
+    forward = [0] * (2 * offset + 1)
+    backward = [0] * (2 * offset + 1)
+
+    for d in range(min(max_d, MYERS_MAX_COST) + 1):
+        # Forward search from the top-left corner
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and forward[offset + k - 1] < forward[offset + k + 1]):
+                x = forward[offset + k + 1]
+            else:
+                x = forward[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            forward[offset + k] = x
+            if odd and -(d - 1) <= delta - k <= d - 1:
+                if x + backward[offset + delta - k] >= n:
+                    return alo + x0, blo + y0, alo + x, blo + y
+
+        # Backward search from the bottom-right corner
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and backward[offset + k - 1] < backward[offset + k + 1]):
+                x = backward[offset + k + 1]
+            else:
+                x = backward[offset + k - 1] + 1
+            y = x - k
+            x0, y0 = x, y
+            while x < n and y < m and a[ahi - x - 1] == b[bhi - y - 1]:
+                x += 1
+                y += 1
+            backward[offset + k] = x
+            if not odd and -d <= delta - k <= d:
+                if x + forward[offset + delta - k] >= n:
+                    return ahi - x, bhi - y, ahi - x0, bhi - y0
+
+    return None
+
+
+def _blocks_to_opcodes(blocks: List[Block], len_a: int, len_b: int) -> List[Opcode]:
+    """Turn sorted matching blocks into opcodes, merging adjacent blocks."""
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for block_i, block_j, size in blocks + [(len_a, len_b, 0)]:
+        if i < block_i and j < block_j:
+            opcodes.append(("replace", i, block_i, j, block_j))
+        elif i < block_i:
+            opcodes.append(("delete", i, block_i, j, j))
+        elif j < block_j:
+            opcodes.append(("insert", i, i, j, block_j))
+        if size:
+            if opcodes and opcodes[-1][0] == "equal":
+                tag, i1, _, j1, _ = opcodes.pop()
+                opcodes.append(("equal", i1, block_i + size, j1, block_j + size))
+            else:
+                opcodes.append(("equal", block_i, block_i + size, block_j, block_j + size))
+        i = block_i + size
+        j = block_j + size
+    return opcodes
+
+
+def _grouped_opcodes(
+    a: Sequence[str], b: Sequence[str], n: int
+) -> Iterator[List[Opcode]]:
+    """Group the edit opcodes between a and b into hunks with n lines of context.
+
+    Follows difflib.SequenceMatcher.get_grouped_opcodes.
+    """
+    codes = histogram_opcodes(*_intern_lines(a, b))
+    if not codes:
+        codes = [("equal", 0, 1, 0, 1)]
+
+    # Trim context from the leading and trailing unchanged runs
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    context = n + n
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # Split the hunk at unchanged runs longer than twice the context
+        if tag == "equal" and i2 - i1 > context:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def _intern_lines(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    """Replace each distinct line with a small integer ID.
+
+    The diff then compares and hashes ints instead of re-examining whole
+    line strings on every comparison. Equal lines always get the same ID, so
+    opcodes computed over the IDs apply unchanged to the original lines.
+    """
+    ids: Dict[str, int] = {}
+    return (
+        [ids.setdefault(line, len(ids)) for line in a],
+        [ids.setdefault(line, len(ids)) for line in b],
+    )
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Convert a half-open line range to unified diff "start,length" form."""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        # Empty ranges begin at the line just before the range
+        beginning -= 1
+    return f"{beginning},{length}"
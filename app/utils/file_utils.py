@@ -2,8 +2,25 @@
 file_utils.py: File operation utilities for the version control system.
 """
 
+import mmap
+import os
+import shutil
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Collection, Container, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows
+    fcntl = None
+
+# Linux ioctl that makes a file share another's extents (btrfs, XFS, ...)
+FICLONE = 0x40049409
+
+# Number of threads used to link or copy files into a snapshot
+SNAPSHOT_WORKERS = 8
 
 def ensure_dir(path: Path) -> None:
     """Ensure a directory exists, creating it if necessary.
@@ -25,15 +42,51 @@ def get_relative_path(file_path: Path, base_path: Path) -> str:
     """
     return str(file_path.resolve().relative_to(base_path))
 
-def write_text_file(path: Path, content: str) -> None:
-    """Write content to a text file, creating directories if needed.
+def write_text_file(path: Path, content: str, durable: bool = False) -> None:
+    """Write content to a text file atomically, creating directories if needed.
+
+    The content is written to a temporary file next to path, which then
+    replaces it, so readers see either the old or the new file, never a
+    partially written one.
 
     Args:
         path (Path): Path to write to
         content (str): Content to write
+        durable (bool, optional): Also flush the file and the rename to disk
+            before returning, so the new content survives a crash. Defaults
+            to False.
     """
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(content, encoding="utf-8")
+    tmp_path = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+    if durable:
+        fsync_dir(path.parent)
+
+def fsync_dir(path: str) -> None:
+    """Flush a directory's entries to disk where the platform allows it.
+
+    Args:
+        path (str): Directory to flush
+    """
+    # Directories cannot be opened for syncing on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
 
 def read_text_file(path: Path) -> Optional[str]:
     """Read content from a text file.
@@ -47,4 +100,150 @@ def read_text_file(path: Path) -> Optional[str]:
     try:
         return path.read_text(encoding="utf-8")
     except (FileNotFoundError, UnicodeDecodeError):
-        return None
\ No newline at end of file
+        return None
+
+def iter_read_chunks(file: BinaryIO, chunk_size: int) -> Iterator[memoryview]:
+    """Yield a file's contents as slices of a single reused read buffer.
+
+    Suited to files that may change while they are read, such as working
+    tree files being added: if one is truncated midway, reading just ends
+    early. Each slice is overwritten by the next read, so callers must
+    consume it immediately (e.g. hasher.update) rather than keep it.
+
+    Args:
+        file (BinaryIO): File opened in binary read mode
+        chunk_size (int): Maximum size of each slice
+
+    Yields:
+        memoryview: Consecutive slices of the file
+    """
+    with memoryview(bytearray(chunk_size)) as buffer:
+        while True:
+            size = file.readinto(buffer)
+            if not size:
+                return
+            with buffer[:size] as chunk:
+                yield chunk
+
+def iter_mapped_chunks(file: BinaryIO, chunk_size: int) -> Iterator[memoryview]:
+    """Yield a file's contents as zero-copy slices of a read-only memory map.
+
+    Each slice is released before the next is produced, so callers must
+    consume it immediately (e.g. hasher.update) rather than keep it.
+
+    Only for files no other process truncates, such as objects in the
+    store: touching a mapped page past the new end of a truncated file
+    kills the process with SIGBUS. Use iter_read_chunks for anything else.
+
+    Args:
+        file (BinaryIO): File opened in binary read mode
+        chunk_size (int): Maximum size of each slice
+
+    Yields:
+        memoryview: Consecutive slices of the file
+    """
+    size = os.fstat(file.fileno()).st_size
+    if size == 0:
+        # Empty files cannot be mapped
+        return
+
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view:
+            for offset in range(0, size, chunk_size):
+                with view[offset:offset + chunk_size] as chunk:
+                    yield chunk
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Hardlink a file to a new path, cloning or copying it if linking fails.
+
+    Linking costs one metadata operation regardless of file size. It fails
+    across filesystems and on filesystems without hardlinks; the file is then
+    reflinked where the filesystem supports copy-on-write clones, and copied
+    with its metadata otherwise.
+
+    Args:
+        src (str): Existing file
+        dst (str): Path to create
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        clone_or_copy(src, dst)
+
+def clone_or_copy(src: str, dst: str) -> None:
+    """Copy a file to a new path as an independent file.
+
+    The file is reflinked where the filesystem supports copy-on-write clones,
+    and copied with its metadata otherwise. Unlike a hardlink, the copy keeps
+    its content when the original is later edited in place.
+
+    Args:
+        src (str): Existing file
+        dst (str): Path to create
+    """
+    if not _reflink(src, dst):
+        shutil.copy2(src, dst)
+
+def _reflink(src: str, dst: str) -> bool:
+    """Clone a file's data into a new file without copying it, if possible."""
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            fcntl.ioctl(dst_file.fileno(), FICLONE, src_file.fileno())
+    except OSError:
+        if os.path.exists(dst):
+            os.unlink(dst)
+        return False
+
+    shutil.copystat(src, dst)
+    return True
+
+def snapshot_tree(
+    src: str, dst: str, ignore: Collection[str] = (), replaced: Container[str] = ()
+) -> int:
+    """Recreate a directory tree at dst with the files of src.
+
+    Files listed in replaced are hardlinked: the caller is about to unlink
+    them and write new files in their place, so the links keep the old
+    content at the cost of one metadata operation each. Every other file is
+    cloned or copied, since a hardlink would follow later in-place edits of
+    the original. The directory structure is created first, then files are
+    linked or copied on a thread pool.
+
+    Args:
+        src (str): Directory to snapshot
+        dst (str): Directory to create; must not already exist
+        ignore (Collection[str], optional): Entry names to skip at any depth.
+            Defaults to ().
+        replaced (Container[str], optional): Paths relative to src of files
+            that will be replaced rather than edited. Defaults to ().
+
+    Returns:
+        int: Number of files in the snapshot
+    """
+    copies = []
+    pending = [(src, dst, "")]
+    while pending:
+        src_dir, dst_dir, rel_dir = pending.pop()
+        os.makedirs(dst_dir)
+        with os.scandir(src_dir) as entries:
+            for entry in entries:
+                if entry.name in ignore:
+                    continue
+                target = os.path.join(dst_dir, entry.name)
+                rel_path = rel_dir + entry.name
+                if entry.is_dir():
+                    pending.append((entry.path, target, rel_path + os.sep))
+                else:
+                    copy = link_or_copy if rel_path in replaced else clone_or_copy
+                    copies.append((copy, entry.path, target))
+
+    if copies:
+        with ThreadPoolExecutor(max_workers=min(SNAPSHOT_WORKERS, len(copies))) as executor:
+            futures = [executor.submit(copy, source, target) for copy, source, target in copies]
+            # Wait on each so any failure is raised here
+            for future in futures:
+                future.result()
+    return len(copies)
\ No newline at end of file
@@ -3,30 +3,34 @@ hash_utils.py: Provides hashing functionality for the version control system.
 """
 
 import hashlib
-from pathlib import Path
-from typing import Tuple
 
-def hash_object(data: str) -> str:
-    """Hash the provided data using SHA1.
+# Read size used when streaming file contents through the hasher
+CHUNK_SIZE = 64 * 1024
 
-    Args:
-        data (str): Data to be hashed
+# Object IDs are SHA1 digests; hashlib dispatches to OpenSSL, which uses the
+# CPU's SHA extensions when they are available
+HASH_ALGORITHM = "sha1"
+
+def new_hasher() -> "hashlib._Hash":
+    """Create a hasher for object content.
+
+    The digest only names content, so it is requested as not used for
+    security; FIPS-restricted OpenSSL builds would otherwise refuse SHA1.
 
     Returns:
-        str: SHA1 hash of the data
+        hashlib._Hash: Fresh hasher for HASH_ALGORITHM
     """
-    hasher = hashlib.sha1()
-    hasher.update(data.encode("utf-8"))
-    return hasher.hexdigest()
+    return hashlib.new(HASH_ALGORITHM, usedforsecurity=False)
 
-def hash_file(file_path: Path) -> Tuple[str, str]:
-    """Hash the contents of a file.
+def hash_bytes(data: bytes) -> str:
+    """Hash already-encoded data using SHA1.
 
     Args:
-        file_path (Path): Path to the file
+        data (bytes): Data to be hashed
 
     Returns:
-        Tuple[str, str]: (hash, content) of the file
+        str: SHA1 hash of the data
     """
-    content = file_path.read_text(encoding="utf-8")
-    return hash_object(content), content
\ No newline at end of file
+    hasher = new_hasher()
+    hasher.update(data)
+    return hasher.hexdigest()
\ No newline at end of file
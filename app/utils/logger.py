@@ -19,13 +19,42 @@ class ColoredFormatter(logging.Formatter):
         "CRITICAL": Fore.RED + Style.BRIGHT,
     }
 
+    def __init__(self, fmt: Optional[str] = None, use_color: Optional[bool] = None):
+        """Initialize the formatter.
+
+        Args:
+            fmt: Log record format string
+            use_color: Whether to color level names; defaults to whether
+                stdout is a terminal
+        """
+        super().__init__(fmt)
+        if use_color is None:
+            use_color = sys.stdout.isatty()
+
+        # Colored level names are built once; without color the table is
+        # empty and records are formatted unchanged
+        self._colored_levels = (
+            {
+                level: f"{color}{level}{Style.RESET_ALL}"
+                for level, color in self.COLORS.items()
+            }
+            if use_color
+            else {}
+        )
+
     def format(self, record):
+        colored = self._colored_levels.get(record.levelname)
+        if colored is None:
+            return super().format(record)
 
-        if record.levelname in self.COLORS:
-            record.levelname = (
-                f"{self.COLORS[record.levelname]}{record.levelname}{Style.RESET_ALL}"
-            )
-        return super().format(record)
+        # Swap the name in only while formatting, so other handlers of the
+        # same record (e.g. the log file) still see the plain level name
+        levelname = record.levelname
+        record.levelname = colored
+        try:
+            return super().format(record)
+        finally:
+            record.levelname = levelname
 
 
 def setup_logger(name: str, log_file: Optional[Path] = None) -> logging.Logger:
@@ -39,7 +68,9 @@ def setup_logger(name: str, log_file: Optional[Path] = None) -> logging.Logger:
         logging.Logger: Configured logger instance
     """
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+    # Debug output only goes to the log file; without one, debug calls are
+    # rejected up front instead of building records no handler will emit
+    logger.setLevel(logging.DEBUG if log_file else logging.INFO)
 
     # Create formatters
     console_formatter = ColoredFormatter("%(levelname)s - %(message)s")
@@ -0,0 +1,112 @@
+"""
+test_chunked_objects.py: Checks of content-defined chunking and chunked object storage.
+"""
+
+import io
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.objects import CHUNKED_OBJECT_MIN_SIZE, MANIFEST_MAGIC, ObjectStore
+from app.utils.chunk_utils import MAX_CHUNK_SIZE, MIN_CHUNK_SIZE, iter_file_chunks
+from app.utils.hash_utils import hash_bytes
+
+
+class ShortReader(io.BytesIO):
+    """Returns at most a few bytes per read, like a pipe or a slow disk."""
+
+    def read(self, size=-1):
+        return super().read(min(size, 1000) if size >= 0 else 1000)
+
+
+def split(data):
+    return list(iter_file_chunks(io.BytesIO(data)))
+
+
+class FileChunksTests(unittest.TestCase):
+    def test_chunks_cover_data(self):
+        rng = random.Random(1)
+        for size in (0, 1, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE + 1, 3 * 1024 * 1024):
+            data = rng.randbytes(size)
+            chunks = split(data)
+            self.assertEqual(b"".join(chunks), data)
+            for chunk in chunks:
+                self.assertLessEqual(len(chunk), MAX_CHUNK_SIZE)
+            for chunk in chunks[:-1]:
+                self.assertGreaterEqual(len(chunk), MIN_CHUNK_SIZE)
+
+    def test_chunks_do_not_depend_on_read_sizes(self):
+        data = random.Random(2).randbytes(MAX_CHUNK_SIZE * 3 + 123)
+        self.assertEqual(list(iter_file_chunks(ShortReader(data))), split(data))
+
+    def test_boundaries_resynchronize_after_insert(self):
+        data = random.Random(3).randbytes(2 * 1024 * 1024)
+        edited = data[:500000] + b"inserted" + data[500000:]
+        self.assertLessEqual(len(set(split(edited)) - set(split(data))), 2)
+
+
+class ChunkedObjectTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir()
+        self.store = ObjectStore(self.objects_dir)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def object_files(self):
+        return {
+            p for p in self.objects_dir.rglob("*") if p.is_file() and p.parent.name != "info"
+        }
+
+    def store_file(self, name, data):
+        path = self.root / name
+        path.write_bytes(data)
+        return self.store.store_object_from_path(path)
+
+    def test_round_trip(self):
+        data = random.Random(3).randbytes(CHUNKED_OBJECT_MIN_SIZE + 12345)
+        hash_value, size = self.store_file("big.bin", data)
+
+        self.assertEqual(hash_value, hash_bytes(data))
+        self.assertEqual(size, len(data))
+        object_path = Path(self.store._object_path(hash_value))
+        self.assertTrue(object_path.read_bytes().startswith(MANIFEST_MAGIC))
+        self.assertEqual(b"".join(self.store._iter_object_chunks(hash_value)), data)
+
+        dest = self.root / "restored.bin"
+        self.assertTrue(self.store.checkout_object(hash_value, dest))
+        self.assertEqual(dest.read_bytes(), data)
+
+    def test_small_files_are_not_chunked(self):
+        data = b"small file\n" * 100
+        hash_value, _ = self.store_file("small.txt", data)
+        self.assertFalse(
+            Path(self.store._object_path(hash_value)).read_bytes().startswith(MANIFEST_MAGIC)
+        )
+        self.assertEqual(self.store.get_object(hash_value), data.decode())
+
+    def test_edit_reuses_chunks(self):
+        data = random.Random(4).randbytes(4 * 1024 * 1024)
+        self.store_file("big.bin", data)
+        before = self.object_files()
+
+        edited = bytearray(data)
+        edited[2 * 1024 * 1024 : 2 * 1024 * 1024 + 16] = b"x" * 16
+        hash_value, _ = self.store_file("big.bin", bytes(edited))
+        added = self.object_files() - before
+
+        # A new manifest plus the one or two chunks around the edit
+        self.assertLessEqual(len(added), 3)
+        self.assertEqual(b"".join(self.store._iter_object_chunks(hash_value)), edited)
+
+        # Storing identical content writes nothing
+        self.store_file("copy.bin", bytes(edited))
+        self.assertEqual(self.object_files(), before | added)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+test_commit_graph.py: Round-trip and recovery checks for the binary commit graph.
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.objects import COMMIT_GRAPH_RECORD, ObjectStore, _timestamp_micros
+
+
+class CommitGraphTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.objects_dir = Path(self._tmp.name) / "objects"
+        self.objects_dir.mkdir()
+        self.store = ObjectStore(self.objects_dir)
+        self.graph_path = self.objects_dir / "info" / "commit-graph"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def make_chain(self, length):
+        commits = []
+        parent = ""
+        for i in range(length):
+            parent = self.store.create_commit(f"commit {i}", {f"f{i}": "0" * 40}, parent)
+            commits.append(parent)
+        return commits
+
+    def test_round_trip(self):
+        commits = self.make_chain(5)
+
+        graph = ObjectStore(self.objects_dir).read_commit_graph()
+        self.assertEqual(set(graph), set(commits))
+        for generation, commit_hash in enumerate(commits, start=1):
+            parent, gen, timestamp = graph[commit_hash]
+            commit_data = self.store.get_commit(commit_hash)
+            self.assertEqual(parent, commit_data["parent"])
+            self.assertEqual(gen, generation)
+            self.assertEqual(commit_data["generation"], generation)
+            self.assertEqual(timestamp, _timestamp_micros(commit_data["timestamp"]))
+        self.assertEqual(
+            os.path.getsize(self.graph_path), len(commits) * COMMIT_GRAPH_RECORD.size
+        )
+
+    def test_partial_record_is_ignored_and_repaired(self):
+        commits = self.make_chain(3)
+        with open(self.graph_path, "ab") as f:
+            f.write(b"\x00" * (COMMIT_GRAPH_RECORD.size // 2))
+
+        store = ObjectStore(self.objects_dir)
+        self.assertEqual(set(store.read_commit_graph()), set(commits))
+
+        tip = store.create_commit("after truncation", {}, commits[-1])
+        self.assertEqual(
+            os.path.getsize(self.graph_path), 4 * COMMIT_GRAPH_RECORD.size
+        )
+        graph = store.read_commit_graph()
+        self.assertEqual(graph[tip], (commits[-1], 4, graph[tip][2]))
+
+    def test_missing_graph_is_rebuilt(self):
+        commits = self.make_chain(4)
+        self.graph_path.unlink()
+
+        store = ObjectStore(self.objects_dir)
+        self.assertEqual(store.read_commit_graph(), {})
+        self.assertEqual(store.update_commit_graph(commits[-1]), 4)
+        graph = store.read_commit_graph()
+        self.assertEqual([graph[c][1] for c in commits], [1, 2, 3, 4])
+
+    def test_iter_history(self):
+        commits = self.make_chain(40)
+        expected = list(reversed(commits))
+
+        store = ObjectStore(self.objects_dir)
+        history = [commit_hash for commit_hash, _ in store.iter_history(commits[-1])]
+        self.assertEqual(history, expected)
+
+        limited = [c for c, _ in store.iter_history(commits[-1], max_entries=7)]
+        self.assertEqual(limited, expected[:7])
+
+        # Commits beyond the graph are followed through their parents
+        self.graph_path.unlink()
+        store = ObjectStore(self.objects_dir)
+        history = [commit_hash for commit_hash, _ in store.iter_history(commits[-1])]
+        self.assertEqual(history, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
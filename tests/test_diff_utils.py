@@ -0,0 +1,175 @@
+"""
+test_diff_utils.py: Randomized checks of the histogram and Myers diff engines.
+"""
+
+import difflib
+import random
+import re
+import unittest
+
+from app.utils.diff_utils import (
+    HISTOGRAM_MAX_CHAIN,
+    histogram_opcodes,
+    myers_opcodes,
+    unified_diff,
+)
+
+HUNK_HEADER = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+def apply_opcodes(a, b, opcodes):
+    """Rebuild the new sequence from the old one and a list of opcodes."""
+    result = []
+    i = j = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (i, j), f"opcodes do not cover the input: {opcodes}"
+        if tag == "equal":
+            assert a[i1:i2] == b[j1:j2], f"unequal 'equal' opcode: {opcodes}"
+            result.extend(a[i1:i2])
+        else:
+            result.extend(b[j1:j2])
+        i, j = i2, j2
+    assert (i, j) == (len(a), len(b)), f"opcodes stop short: {opcodes}"
+    return result
+
+
+def apply_unified_diff(a, diff_lines):
+    """Apply the hunks of a unified diff to the old lines."""
+    result = []
+    pos = 0
+    k = 2  # past the --- / +++ header
+    while k < len(diff_lines):
+        match = HUNK_HEADER.match(diff_lines[k])
+        assert match, diff_lines[k]
+        start, length = int(match.group(1)), int(match.group(2) or 1)
+        start = start - 1 if length else start
+        result.extend(a[pos:start])
+        pos = start
+        k += 1
+        while k < len(diff_lines) and not diff_lines[k].startswith("@@"):
+            op, line = diff_lines[k][0], diff_lines[k][1:]
+            if op in " -":
+                assert a[pos] == line
+                pos += 1
+            if op in " +":
+                result.append(line)
+            k += 1
+    result.extend(a[pos:])
+    return result
+
+
+def lcs_length(a, b):
+    """Length of the longest common subsequence, by dynamic programming."""
+    row = [0] * (len(b) + 1)
+    for x in a:
+        prev_diag = 0
+        for j, y in enumerate(b):
+            prev_diag, row[j + 1] = row[j + 1], (
+                prev_diag + 1 if x == y else max(row[j + 1], row[j])
+            )
+    return row[-1]
+
+
+def random_lines(rng, max_len, alphabet):
+    return [f"{rng.randint(0, alphabet)}\n" for _ in range(rng.randint(0, max_len))]
+
+
+class OpcodeTests(unittest.TestCase):
+    def test_opcodes_reproduce_new_sequence(self):
+        rng = random.Random(1)
+        for max_len, runs in ((30, 2000), (400, 300)):
+            for _ in range(runs):
+                alphabet = rng.randint(1, 6)
+                a = random_lines(rng, max_len, alphabet)
+                b = random_lines(rng, max_len, alphabet)
+                for engine in (histogram_opcodes, myers_opcodes):
+                    self.assertEqual(apply_opcodes(a, b, engine(a, b)), b)
+
+    def test_lines_repeated_past_chain_limit(self):
+        # Lines occurring more than HISTOGRAM_MAX_CHAIN times are never
+        # anchors; at exactly the limit they still are
+        for repeats in (HISTOGRAM_MAX_CHAIN, HISTOGRAM_MAX_CHAIN + 1, 200):
+            a = ["x"] * repeats + ["y"] * repeats
+            b = ["y", "x"]
+            self.assertEqual(apply_opcodes(a, b, histogram_opcodes(a, b)), b)
+            self.assertEqual(apply_opcodes(b, a, histogram_opcodes(b, a)), a)
+
+    def test_opcodes_merge_adjacent_equal_runs(self):
+        rng = random.Random(2)
+        for _ in range(1000):
+            a = rng.choices("abcdefg", k=rng.randint(0, 40))
+            b = rng.choices("abcdefg", k=rng.randint(0, 40))
+            opcodes = histogram_opcodes(a, b)
+            for prev, cur in zip(opcodes, opcodes[1:]):
+                self.assertFalse(prev[0] == cur[0] == "equal", opcodes)
+
+    def test_myers_is_minimal(self):
+        rng = random.Random(3)
+        for max_len, runs in ((25, 1000), (300, 40)):
+            for _ in range(runs):
+                a = rng.choices(range(5), k=rng.randint(0, max_len))
+                b = rng.choices(range(5), k=rng.randint(0, max_len))
+                self.check_minimal(a, b)
+
+    def check_minimal(self, a, b):
+        opcodes = myers_opcodes(a, b)
+        kept = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == "equal")
+        self.assertEqual(kept, lcs_length(a, b), (a, b, opcodes))
+
+        # Never keeps fewer lines than difflib's matcher, so never a
+        # longer diff
+        matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+        difflib_kept = sum(size for _, _, size in matcher.get_matching_blocks())
+        self.assertGreaterEqual(kept, difflib_kept)
+
+    def test_identical_and_empty_inputs(self):
+        lines = ["a\n", "b\n"]
+        for engine in (histogram_opcodes, myers_opcodes):
+            self.assertEqual(engine(lines, lines), [("equal", 0, 2, 0, 2)])
+            self.assertEqual(engine([], lines), [("insert", 0, 0, 0, 2)])
+            self.assertEqual(engine(lines, []), [("delete", 0, 2, 0, 0)])
+            self.assertEqual(engine([], []), [])
+
+
+class UnifiedDiffTests(unittest.TestCase):
+    def test_patch_applies(self):
+        rng = random.Random(4)
+        for max_len, runs in ((30, 2000), (300, 200)):
+            for _ in range(runs):
+                alphabet = rng.randint(1, 6)
+                a = random_lines(rng, max_len, alphabet)
+                b = random_lines(rng, max_len, alphabet)
+                self.check_patch_applies(a, b)
+
+    def check_patch_applies(self, a, b):
+        diff_lines = list(unified_diff(a, b, "a", "b"))
+        expected = list(difflib.unified_diff(a, b, "a", "b", lineterm=""))
+        self.assertEqual(bool(diff_lines), bool(expected))
+        if diff_lines:
+            self.assertEqual(diff_lines[:2], ["--- a", "+++ b"])
+            self.assertEqual(apply_unified_diff(a, diff_lines), b)
+
+    def test_matches_difflib_on_simple_change(self):
+        a = ["one", "two", "three", "four", "five"]
+        b = ["one", "two", "3", "four", "five", "six"]
+        self.assertEqual(
+            list(unified_diff(a, b, "a", "b")),
+            list(difflib.unified_diff(a, b, "a", "b", lineterm="")),
+        )
+
+    def test_anchors_on_unique_lines(self):
+        a = "int f() {\n    return 1;\n}\n\nint g() {\n    return 2;\n}\n".splitlines()
+        b = (
+            "int f() {\n    return 1;\n}\n\nint h() {\n    return 3;\n}\n\n"
+            "int g() {\n    return 2;\n}\n"
+        ).splitlines()
+        added = [
+            line[1:]
+            for line in unified_diff(a, b)
+            if line.startswith("+") and not line.startswith("+++")
+        ]
+        self.assertEqual(added, ["int h() {", "    return 3;", "}", ""])
+
+
+if __name__ == "__main__":
+    unittest.main()
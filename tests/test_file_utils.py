@@ -0,0 +1,46 @@
+"""
+test_file_utils.py: Checks of the file reading helpers.
+"""
+
+import os
+import tempfile
+import unittest
+
+from app.utils.file_utils import iter_mapped_chunks, iter_read_chunks
+
+
+class ChunkReadTests(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.data = bytes(range(256)) * 1000
+        with open(self.path, "wb") as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.unlink(self.path)
+
+    def test_chunks_cover_file(self):
+        for reader in (iter_read_chunks, iter_mapped_chunks):
+            with open(self.path, "rb") as f:
+                chunks = [bytes(chunk) for chunk in reader(f, 4096)]
+            self.assertEqual(b"".join(chunks), self.data)
+            self.assertTrue(all(len(chunk) <= 4096 for chunk in chunks))
+
+    def test_empty_file(self):
+        open(self.path, "wb").close()
+        for reader in (iter_read_chunks, iter_mapped_chunks):
+            with open(self.path, "rb") as f:
+                self.assertEqual(list(reader(f, 4096)), [])
+
+    def test_read_survives_truncation(self):
+        with open(self.path, "rb") as f:
+            chunks = iter_read_chunks(f, 4096)
+            first = bytes(next(chunks))
+            os.truncate(self.path, 10000)
+            rest = b"".join(bytes(chunk) for chunk in chunks)
+        self.assertEqual(first + rest, self.data[:10000])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+test_index.py: Checks of the staging index and its batched writes.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.index import Index
+
+
+class IndexTests(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.index_path = Path(self._tmp.name) / "index"
+        self.index = Index(self.index_path)
+        self.index.clear()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def on_disk(self):
+        return json.loads(self.index_path.read_text())["entries"]
+
+    def test_add_file_writes_immediately(self):
+        self.index.add_file("a.txt", "1" * 40, 3)
+        self.assertEqual(self.on_disk()["a.txt"]["hash"], "1" * 40)
+        self.assertEqual(self.on_disk()["a.txt"]["size"], 3)
+
+    def test_open_writes_once_on_exit(self):
+        with self.index.open():
+            self.index.add_file_cached("a.txt", "1" * 40, 1)
+            with self.index.open():
+                self.index.add_file("b.txt", "2" * 40, 2)
+            self.assertEqual(self.on_disk(), {})
+            self.assertEqual(set(self.index.get_staged_files()), {"a.txt", "b.txt"})
+
+        entries = self.on_disk()
+        self.assertEqual(set(entries), {"a.txt", "b.txt"})
+        # Every file added in one batch shares its staging time
+        self.assertEqual(entries["a.txt"]["timestamp"], entries["b.txt"]["timestamp"])
+
+    def test_open_discards_changes_on_error(self):
+        self.index.add_file("a.txt", "1" * 40, 1)
+        with self.assertRaises(KeyError):
+            with self.index.open():
+                self.index.add_file_cached("b.txt", "2" * 40, 2)
+                raise KeyError("b.txt")
+
+        self.assertEqual(set(self.on_disk()), {"a.txt"})
+        self.assertEqual(set(self.index.get_staged_files()), {"a.txt"})
+
+    def test_add_file_cached_requires_open(self):
+        with self.assertRaises(RuntimeError):
+            self.index.add_file_cached("a.txt", "1" * 40, 1)
+
+    def test_read_sees_other_writers(self):
+        self.assertEqual(self.index.get_staged_files(), {})
+        Index(self.index_path).add_file("a.txt", "1" * 40, 1)
+        self.assertEqual(set(self.index.get_staged_files()), {"a.txt"})
+
+        self.index_path.unlink()
+        self.assertEqual(self.index.get_staged_files(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,178 @@
+"""
+test_object_store.py: Checks of object storage, legacy layouts and batched writes.
+"""
+
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from app.core import objects
+from app.core.objects import GZIP_MAGIC, OBJECT_FILE_MODE, ObjectStore
+from app.utils.hash_utils import hash_bytes
+
+
+def setUpModule():
+    logging.disable(logging.CRITICAL)
+
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+
+class ObjectStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.objects_dir = Path(self._tmp.name) / "objects"
+        self.objects_dir.mkdir()
+        self.store = ObjectStore(self.objects_dir)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def object_files(self):
+        """Paths of every file in the store outside objects/info."""
+        return {
+            str(path.relative_to(self.objects_dir))
+            for path in self.objects_dir.rglob("*")
+            if path.is_file() and path.parent.name != "info"
+        }
+
+
+class CompressedObjectTests(ObjectStoreTestCase):
+    def test_round_trip(self):
+        content = "line\n" * 1000
+        hash_value = self.store.store_object(content)
+
+        self.assertEqual(hash_value, hash_bytes(content.encode()))
+        stored = Path(self.store._object_path(hash_value)).read_bytes()
+        self.assertTrue(stored.startswith(GZIP_MAGIC))
+        self.assertLess(len(stored), len(content))
+        self.assertEqual(self.store.get_object(hash_value), content)
+        self.assertEqual(list(self.store.iter_object_lines(hash_value)), ["line\n"] * 1000)
+
+    def test_uncompressed_objects_are_read(self):
+        data = b"stored by an earlier version\n"
+        hash_value = hash_bytes(data)
+        object_path = Path(self.store._object_path(hash_value))
+        object_path.parent.mkdir()
+        object_path.write_bytes(data)
+
+        self.assertEqual(self.store.get_object(hash_value), data.decode())
+
+    def test_truncated_object_is_not_returned(self):
+        hash_value = self.store.store_object("some content " * 100)
+        object_path = Path(self.store._object_path(hash_value))
+        object_path.write_bytes(object_path.read_bytes()[:-10])
+
+        self.assertIsNone(self.store.get_object(hash_value))
+
+    def test_missing_object(self):
+        self.assertIsNone(self.store.get_object("0" * 40))
+        self.assertFalse(self.store.has_object("0" * 40))
+
+
+class ShardMigrationTests(ObjectStoreTestCase):
+    def write_flat(self, data):
+        hash_value = hash_bytes(data)
+        (self.objects_dir / hash_value).write_bytes(data)
+        return hash_value
+
+    def test_flat_objects_are_read_without_migrating(self):
+        hash_value = self.write_flat(b"flat object\n")
+
+        store = ObjectStore(self.objects_dir)
+        self.assertTrue(store.has_object(hash_value))
+        self.assertEqual(store.get_object(hash_value), "flat object\n")
+        self.assertEqual(self.object_files(), {hash_value})
+
+    def test_ensure_sharded_migrates_once(self):
+        hashes = [self.write_flat(f"object {i}\n".encode()) for i in range(3)]
+
+        store = ObjectStore(self.objects_dir)
+        self.assertEqual(store.ensure_sharded(), 3)
+        self.assertTrue((self.objects_dir / "info" / "sharded").exists())
+        self.assertEqual(
+            self.object_files(), {os.path.join(h[:2], h[2:]) for h in hashes}
+        )
+        for i, hash_value in enumerate(hashes):
+            self.assertEqual(store.get_object(hash_value), f"object {i}\n")
+
+        # A flat file appearing later is not looked for once marked
+        late = self.write_flat(b"late\n")
+        store = ObjectStore(self.objects_dir)
+        self.assertEqual(store.ensure_sharded(), 0)
+        self.assertFalse(store.has_object(late))
+
+    def test_missing_objects_dir(self):
+        store = ObjectStore(self.objects_dir / "missing")
+        self.assertEqual(store.migrate_flat_objects(), 0)
+        self.assertEqual(store.ensure_sharded(), 0)
+
+
+class PublishTests(ObjectStoreTestCase):
+    def test_objects_get_the_usual_file_mode(self):
+        hash_value = self.store.store_object("content\n")
+        mode = os.stat(self.store._object_path(hash_value)).st_mode & 0o777
+        self.assertEqual(mode, OBJECT_FILE_MODE)
+        self.assertEqual(self.object_files(), {os.path.join(hash_value[:2], hash_value[2:])})
+
+    def test_failed_flush_leaves_no_object(self):
+        with mock.patch("app.core.objects._fsync_file", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.store.store_object("content\n")
+        self.assertEqual(self.object_files(), set())
+        self.assertFalse(self.store.has_object(hash_bytes(b"content\n")))
+
+    def test_batch_discards_objects_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.store.batch():
+                hash_value = self.store.store_object("content\n")
+                raise ValueError("abort")
+        self.assertEqual(self.object_files(), set())
+        self.assertFalse(self.store.has_object(hash_value))
+
+    def test_duplicate_content_in_batch(self):
+        with self.store.batch():
+            first = self.store.store_object("same\n")
+            second = self.store.store_object("same\n")
+        self.assertEqual(first, second)
+        self.assertEqual(self.object_files(), {os.path.join(first[:2], first[2:])})
+
+
+class BatchTests(ObjectStoreTestCase):
+    def test_objects_appear_when_batch_exits(self):
+        with self.store.batch():
+            hash_value = self.store.store_object("content\n")
+            with self.store.batch():
+                nested = self.store.store_object("nested\n")
+            # Joining the outer batch, the nested block publishes nothing
+            self.assertFalse(self.store.has_object(hash_value))
+            self.assertFalse(self.store.has_object(nested))
+
+        self.assertEqual(self.store.get_object(hash_value), "content\n")
+        self.assertEqual(self.store.get_object(nested), "nested\n")
+
+    def test_unbatched_objects_appear_immediately(self):
+        hash_value = self.store.store_object("content\n")
+        self.assertTrue(self.store.has_object(hash_value))
+
+    def test_batch_syncs_each_shard_once(self):
+        with mock.patch(
+            "app.core.objects.fsync_dir", wraps=objects.fsync_dir
+        ) as fsync_dir, mock.patch(
+            "app.core.objects._fsync_file", wraps=objects._fsync_file
+        ) as fsync_file:
+            with self.store.batch():
+                hashes = {self.store.store_object(f"object {i}\n") for i in range(50)}
+
+        self.assertEqual(fsync_file.call_count, 50)
+        shards = {os.path.join(str(self.objects_dir), h[:2]) for h in hashes}
+        self.assertEqual({call.args[0] for call in fsync_dir.call_args_list}, shards)
+        self.assertEqual(fsync_dir.call_count, len(shards))
+
+
+if __name__ == "__main__":
+    unittest.main()
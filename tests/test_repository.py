@@ -0,0 +1,181 @@
+"""
+test_repository.py: Checks of repository commands against a temporary working tree.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+
+from app.core.repository import Repository
+
+
+def setUpModule():
+    logging.disable(logging.CRITICAL)
+
+
+def tearDownModule():
+    logging.disable(logging.NOTSET)
+
+
+class RepositoryTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name).resolve()
+        self.work = self.root / "repo"
+        self.outside = self.root / "outside"
+        self.work.mkdir()
+        self.outside.mkdir()
+        self.repo = Repository(str(self.work))
+        self.repo.init()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def write(self, rel_path, content):
+        path = self.work / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return path
+
+
+class PathContainmentTests(RepositoryTestCase):
+    def test_add_rejects_paths_outside(self):
+        secret = self.outside / "secret.txt"
+        secret.write_text("secret\n")
+        os.symlink(secret, self.work / "link.txt")
+        os.symlink(self.outside, self.work / "linked_dir")
+
+        paths = (
+            secret,
+            self.work / ".." / "outside" / "secret.txt",
+            self.work / "link.txt",
+            self.work / "linked_dir" / "secret.txt",
+        )
+        for path in paths:
+            with self.assertRaises(ValueError, msg=str(path)):
+                self.repo.add(str(path))
+            with self.assertRaises(ValueError, msg=str(path)):
+                self.repo.add_many([str(path)])
+        self.assertEqual(self.repo.index.get_staged_files(), {})
+
+    def test_add_follows_symlinks_inside(self):
+        self.write("real/a.txt", "a\n")
+        os.symlink("a.txt", self.work / "real" / "link.txt")
+        os.symlink(self.work / "real", self.work / "alias")
+
+        self.repo.add_many([str(self.work / "real" / "link.txt")])
+        self.repo.add(str(self.work / "alias" / "a.txt"))
+        staged = self.repo.index.get_staged_files()
+        self.assertEqual(
+            set(staged), {os.path.join("real", "link.txt"), os.path.join("alias", "a.txt")}
+        )
+
+    def test_restore_does_not_write_through_symlinks_outside(self):
+        self.write("link.txt", "committed\n")
+        self.repo.add(str(self.work / "link.txt"))
+        commit = self.repo.create_commit("first")
+        self.repo.add(str(self.work / "link.txt"))
+
+        target = self.outside / "target.txt"
+        target.write_text("outside\n")
+        (self.work / "link.txt").unlink()
+        os.symlink(os.path.join("..", "outside", "target.txt"), self.work / "link.txt")
+
+        with self.assertRaises(ValueError):
+            self.repo.restore([str(self.work / "link.txt")], source=commit)
+        with self.assertRaises(ValueError):
+            self.repo.restore([str(self.work / "link.txt")], staged=True)
+        self.assertEqual(target.read_text(), "outside\n")
+
+
+class RestoreTests(RepositoryTestCase):
+    def test_restore_keeps_mode_and_symlinks(self):
+        script = self.write("run.sh", "echo one\n")
+        script.chmod(0o755)
+        self.write("data/real.txt", "real\n")
+        os.symlink("real.txt", self.work / "data" / "link.txt")
+        self.repo.add_many([str(script), str(self.work / "data" / "link.txt")])
+        commit = self.repo.create_commit("first")
+
+        script.write_text("echo two\n")
+        (self.work / "data" / "real.txt").write_text("changed\n")
+        self.repo.restore(
+            [str(script), str(self.work / "data" / "link.txt")], source=commit
+        )
+
+        self.assertEqual(script.read_text(), "echo one\n")
+        self.assertEqual(script.stat().st_mode & 0o777, 0o755)
+        self.assertTrue((self.work / "data" / "link.txt").is_symlink())
+        self.assertEqual((self.work / "data" / "real.txt").read_text(), "real\n")
+
+    def test_hard_restore_backup_is_independent(self):
+        tracked = self.write("tracked.txt", "committed\n")
+        self.repo.add(str(tracked))
+        self.repo.create_commit("first")
+
+        tracked.write_text("local edit\n")
+        untracked = self.write("sub/untracked.txt", "untracked\n")
+        self.repo.restore_hard()
+
+        backup_dir = self.work / ".pygrits" / "backup" / "working_tree"
+        self.assertEqual(tracked.read_text(), "committed\n")
+        self.assertEqual((backup_dir / "tracked.txt").read_text(), "local edit\n")
+
+        with open(untracked, "a") as f:
+            f.write("more\n")
+        self.assertEqual(
+            (backup_dir / "sub" / "untracked.txt").read_text(), "untracked\n"
+        )
+
+
+class AncestryTests(RepositoryTestCase):
+    def make_chain(self, length, parent=""):
+        commits = []
+        for i in range(length):
+            parent = self.repo.object_store.create_commit(f"commit {i}", {}, parent)
+            commits.append(parent)
+        return commits
+
+    def test_ancestors_in_chain(self):
+        first, middle, last = self.make_chain(3)
+        self.assertTrue(self.repo.is_ancestor(first, last))
+        self.assertTrue(self.repo.is_ancestor(middle, last))
+        self.assertFalse(self.repo.is_ancestor(last, first))
+
+    def test_commit_is_its_own_ancestor(self):
+        (commit,) = self.make_chain(1)
+        self.assertTrue(self.repo.is_ancestor(commit, commit))
+
+    def test_unrelated_commits(self):
+        chain = self.make_chain(3)
+        other = self.make_chain(2)
+        self.assertFalse(self.repo.is_ancestor(other[0], chain[-1]))
+        self.assertFalse(self.repo.is_ancestor(chain[0], other[-1]))
+        self.assertFalse(self.repo.is_ancestor("0" * 40, chain[-1]))
+
+    def test_commits_without_generation_or_graph(self):
+        store = self.repo.object_store
+        parent = ""
+        legacy = []
+        for i in range(3):
+            parent = store.store_object(
+                json.dumps(
+                    {"parent": parent, "timestamp": "", "message": f"old {i}", "files": {}}
+                )
+            )
+            legacy.append(parent)
+        tip = self.make_chain(1, parent=legacy[-1])[0]
+        (self.work / ".pygrits" / "objects" / "info" / "commit-graph").unlink()
+
+        repo = Repository(str(self.work))
+        self.assertTrue(repo.is_ancestor(legacy[0], tip))
+        self.assertTrue(repo.is_ancestor(legacy[1], legacy[2]))
+        self.assertFalse(repo.is_ancestor(tip, legacy[0]))
+        self.assertFalse(repo.is_ancestor(self.make_chain(1)[0], tip))
+
+
+if __name__ == "__main__":
+    unittest.main()